@@ -1,13 +1,35 @@
 import os
 
+from src.fetch_data.archive import PlenarprotokollArchive, is_archive, pack_directory
 from src.fetch_data.get_data import scrape_data
+from src.instrumentation.run_report import run_report
 
 
 if __name__ == "__main__":
+    run_report.start_profiling(os.getenv("PROFILE"))
     if os.path.exists(os.getenv("XML_PATH")) and not os.path.isdir(
         os.getenv("XML_PATH")
     ):
         raise ValueError(f"path {os.getenv("XML_PATH")} already exists")
     os.makedirs(os.getenv("XML_PATH"), exist_ok=True)
 
-    scrape_data(output_directory_path=os.getenv("XML_PATH"))
+    # write the protocols into a compressed archive instead of single files, protocols
+    # downloaded into XML_PATH by earlier runs are copied into a new archive first
+    archive = None
+    if os.getenv("XML_ARCHIVE_PATH"):
+        if not is_archive(os.getenv("XML_ARCHIVE_PATH")):
+            pack_directory(os.getenv("XML_PATH"), os.getenv("XML_ARCHIVE_PATH"))
+        archive = PlenarprotokollArchive(os.getenv("XML_ARCHIVE_PATH"))
+
+    try:
+        scrape_data(
+            output_directory_path=os.getenv("XML_PATH"),
+            concurrency=int(os.getenv("SCRAPER_CONCURRENCY", 4)),
+            requests_per_second=float(os.getenv("SCRAPER_REQUESTS_PER_SECOND", 0.2)),
+            refresh=os.getenv("SCRAPER_REFRESH", "0") == "1",
+            archive=archive,
+        )
+    finally:
+        if archive is not None:
+            archive.close()
+    run_report.finish("01_scrape_data", os.getenv("RUN_REPORT_PATH"))
@@ -1,6 +1,10 @@
 import os
 
+from src.instrumentation.run_report import run_report
 from src.sqlite.setup_db import setup_database
 
 if __name__ == "__main__":
-    setup_database(database_path=os.getenv("DATABASE_FILEPATH"))
+    run_report.start_profiling(os.getenv("PROFILE"))
+    with run_report.stage("setup"):
+        setup_database(database_path=os.getenv("DATABASE_FILEPATH"))
+    run_report.finish("02_setup_database", os.getenv("RUN_REPORT_PATH"))
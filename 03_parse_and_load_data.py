@@ -1,18 +1,81 @@
 import os
 
+from src.analysis.comment_statistics import refresh_comment_statistics
+from src.analysis.similarity_index import update_similarity_index
+from src.analysis.term_index import update_term_index
+from src.export.columnar_export import export_sitzungen
+from src.fetch_data.archive import list_protokolle
+from src.instrumentation.run_report import run_report
 from src.preprocessing.parse_data import PlenarprotokollXMLParser
-from src.sqlite.load_data_into_db import load_data_into_db
+from src.sqlite.incremental_load import update_database
+from src.sqlite.load_data_into_db import load_sitzungen_into_db, read_registry
 
 if __name__ == "__main__":
-    parser = PlenarprotokollXMLParser()
-    print("parsing files...")
-    parser.crawl_directory(
-        input_directory_path=os.getenv("XML_PATH"),
-        output_directory_path=os.getenv("JSON_PATH"),
-    )
-    print("loading data into database...")
-    load_data_into_db(
-        json_directory_path=os.getenv("JSON_PATH"),
-        database_path=os.getenv("DATABASE_FILEPATH"),
-    )
+    run_report.start_profiling(os.getenv("PROFILE"))
+    # read the protocols from the archive of the scraper if one is configured
+    xml_path = os.getenv("XML_ARCHIVE_PATH") or os.getenv("XML_PATH")
+    # stream large protocols through iterparse instead of building the whole tree
+    iterparse = os.getenv("PARSER_ITERPARSE", "0") == "1"
+    if os.getenv("INCREMENTAL_LOAD", "0") == "1":
+        # data.json is written in one piece and can't be updated with only the changed
+        # sitzungen
+        if os.getenv("JSON_EXPORT", "0") == "1":
+            raise ValueError("JSON_EXPORT can't be combined with INCREMENTAL_LOAD")
+        print("updating database with new and changed files...")
+        update_database(
+            input_directory_path=xml_path,
+            database_path=os.getenv("DATABASE_FILEPATH"),
+            workers=int(os.getenv("PARSER_WORKERS", 1)),
+            iterparse=iterparse,
+            parquet_directory_path=(
+                os.getenv("PARQUET_PATH")
+                if os.getenv("PARQUET_EXPORT", "0") == "1"
+                else None
+            ),
+        )
+    else:
+        # continue the ids of speakers, roles and fraktionen already in the database
+        parser = PlenarprotokollXMLParser(
+            iterparse=iterparse,
+            registry=read_registry(os.getenv("DATABASE_FILEPATH")),
+        )
+        pathlist = list_protokolle(xml_path)
+        sitzungen = parser.iter_sitzungen(
+            pathlist, workers=int(os.getenv("PARSER_WORKERS", 1))
+        )
+        # optionally write the columnar export while the sitzungen stream through
+        if os.getenv("PARQUET_EXPORT", "0") == "1":
+            sitzungen = export_sitzungen(sitzungen, os.getenv("PARQUET_PATH"))
+        print("parsing files and loading data into database...")
+        load_sitzungen_into_db(
+            sitzungen,
+            database_path=os.getenv("DATABASE_FILEPATH"),
+            json_directory_path=(
+                os.getenv("JSON_PATH") if os.getenv("JSON_EXPORT", "0") == "1" else None
+            ),
+            expected_sitzungen=len(pathlist),
+        )
+    # bring the term-frequency index up to date with the loaded reden
+    if os.getenv("TERM_INDEX", "0") == "1":
+        print("updating term index...")
+        with run_report.stage("analysis.term_index"):
+            update_term_index(
+                database_path=os.getenv("DATABASE_FILEPATH"),
+                cache_path=os.getenv("TOKEN_CACHE_PATH"),
+                workers=int(os.getenv("PARSER_WORKERS", 1)),
+            )
+    # sign new and changed reden for the near-duplicate search
+    if os.getenv("SIMILARITY_INDEX", "0") == "1":
+        print("updating similarity index...")
+        with run_report.stage("analysis.similarity_index"):
+            update_similarity_index(
+                database_path=os.getenv("DATABASE_FILEPATH"),
+                workers=int(os.getenv("PARSER_WORKERS", 1)),
+            )
+    # recompute the materialized interjection statistics
+    if os.getenv("COMMENT_STATISTICS", "0") == "1":
+        print("refreshing comment statistics...")
+        with run_report.stage("analysis.comment_statistics"):
+            refresh_comment_statistics(database_path=os.getenv("DATABASE_FILEPATH"))
+    run_report.finish("03_parse_and_load_data", os.getenv("RUN_REPORT_PATH"))
     print("process ended successfully")
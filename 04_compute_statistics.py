@@ -0,0 +1,17 @@
+import os
+
+from src.analysis.corpus_statistics import corpus_statistics, write_corpus_statistics
+from src.instrumentation.run_report import run_report
+
+if __name__ == "__main__":
+    run_report.start_profiling(os.getenv("PROFILE"))
+    print("computing corpus statistics...")
+    with run_report.stage("analysis.corpus_statistics"):
+        statistics = corpus_statistics(
+            database_path=os.getenv("DATABASE_FILEPATH"),
+            chunksize=int(os.getenv("STATISTICS_CHUNKSIZE", 50_000)),
+        )
+    with run_report.stage("export.statistics"):
+        write_corpus_statistics(statistics, os.getenv("STATISTICS_PATH"))
+    run_report.finish("04_compute_statistics", os.getenv("RUN_REPORT_PATH"))
+    print("process ended successfully")
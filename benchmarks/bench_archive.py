@@ -0,0 +1,115 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic_corpus import generate_corpus
+from src.fetch_data.archive import (
+    PlenarprotokollArchive,
+    list_protokolle,
+    open_protokoll,
+    pack_directory,
+)
+from src.preprocessing.parse_data import PlenarprotokollXMLParser
+
+
+def directory_size(directory_path: str) -> int:
+    return sum(path.stat().st_size for path in Path(directory_path).rglob("*.xml"))
+
+
+# list every protocol and read it completely, as the parser does
+def walk_and_read(input_path: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    total = 0
+    for source in list_protokolle(input_path):
+        with open_protokoll(source) as file:
+            total += len(file.read())
+    return time.perf_counter() - start, total
+
+
+def run_parser(input_path: str) -> tuple[float, dict]:
+    parser = PlenarprotokollXMLParser()
+    start = time.perf_counter()
+    parser.parse_files(list_protokolle(input_path))
+    elapsed = time.perf_counter() - start
+    return elapsed, {
+        "data": parser.data,
+        "redner": parser.redner,
+        "rollen": parser.rollen,
+    }
+
+
+# average time to find and read one protocol by wahlperiode and sitzung-nr
+def single_lookups(
+    corpus_directory: str, archive: PlenarprotokollArchive, keys: list[tuple[int, int]]
+) -> tuple[float, float]:
+    start = time.perf_counter()
+    for wahlperiode, sitzung_nr in keys:
+        path = os.path.join(corpus_directory, f"{wahlperiode}{sitzung_nr:03d}.xml")
+        with open(path, "rb") as file:
+            file.read()
+    directory_time = (time.perf_counter() - start) / len(keys)
+
+    start = time.perf_counter()
+    for wahlperiode, sitzung_nr in keys:
+        archive.read(wahlperiode, sitzung_nr)
+    archive_time = (time.perf_counter() - start) / len(keys)
+    return directory_time, archive_time
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="compare a directory of protocols against the compressed archive"
+    )
+    argument_parser.add_argument("--sitzungen", type=int, default=200)
+    argument_parser.add_argument("--lookups", type=int, default=1000)
+    args = argument_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_directory:
+        generate_corpus(corpus_directory, num_sitzungen=args.sitzungen)
+        archive_path = os.path.join(corpus_directory, "protokolle.archive")
+
+        start = time.perf_counter()
+        pack_directory(corpus_directory, archive_path)
+        print(f"packing:       {time.perf_counter() - start:7.2f}s")
+
+        xml_size = directory_size(corpus_directory)
+        archive_size = os.path.getsize(archive_path) + os.path.getsize(
+            archive_path + ".index"
+        )
+        print(
+            f"footprint:     {xml_size / 1e6:7.2f} MB xml, "
+            f"{archive_size / 1e6:7.2f} MB archive and index "
+            f"({archive_size / xml_size:.1%})"
+        )
+
+        for name, input_path in (
+            ("directory", corpus_directory),
+            ("archive", archive_path),
+        ):
+            elapsed, total = walk_and_read(input_path)
+            print(f"read {name + ':':<10}{elapsed:7.3f}s for {total / 1e6:.2f} MB")
+
+        directory_time, directory_result = run_parser(corpus_directory)
+        archive_time, archive_result = run_parser(archive_path)
+        print(
+            f"parse:         {directory_time:7.2f}s directory, {archive_time:7.2f}s "
+            f"archive (identical: {directory_result == archive_result})"
+        )
+
+        archive = PlenarprotokollArchive(archive_path)
+        members = archive.members()
+        keys = [
+            (member.wahlperiode, member.sitzung_nr)
+            for member in random.choices(members, k=args.lookups)
+        ]
+        directory_lookup, archive_lookup = single_lookups(
+            corpus_directory, archive, keys
+        )
+        archive.close()
+        print(
+            f"single lookup: {directory_lookup * 1e3:7.3f} ms directory, "
+            f"{archive_lookup * 1e3:7.3f} ms archive"
+        )
@@ -0,0 +1,119 @@
+import argparse
+import re
+import tempfile
+import timeit
+import xml.etree.ElementTree as ET
+from collections import Counter
+from pathlib import Path
+
+from benchmarks.synthetic_corpus import generate_corpus
+from src.preprocessing.interjections import extract_interjections
+from src.preprocessing.normalize import default_normalizer
+
+LEGACY_PATTERN = re.compile(
+    r"([A-Za-zäöüÄÖÜßğ\.\s]+) \[([A-Za-z0-9äöüÄÖÜß\s/]+)\]: (.+)"
+)
+# the dash separating the interjections of a normalized comment
+SEPARATOR_PATTERN = re.compile(r"\s-\s")
+
+
+# the previous implementation, splitting on every hyphen and searching each segment
+def extract_spoken_comments_legacy(comment: str) -> list[dict]:
+    extracted_info = []
+    for segment in comment.split("-"):
+        for person, party, text in LEGACY_PATTERN.findall(segment):
+            extracted_info.append(
+                {
+                    "commentator": person.strip(),
+                    "fraktion": party.strip(),
+                    "text": text.rstrip(")").strip(),
+                }
+            )
+    return extracted_info
+
+
+# the normalized text of every kommentar element, as the parser passes it on
+def collect_comments(pathlist: list[Path]) -> list[str]:
+    comments = []
+    for path in pathlist:
+        for kommentar in ET.parse(path).getroot().iter("kommentar"):
+            if kommentar.text is not None:
+                comments.append(default_normalizer.normalize(kommentar.text))
+    return comments
+
+
+# segments of the comments that yield no interjection of their own, reactions and
+# interjections the extractor doesn't recognise end up here, as do stage notes and
+# spoken text continued after a dash
+def count_lost_segments(comments: list[str]) -> int:
+    lost = 0
+    for comment in comments:
+        for segment in SEPARATOR_PATTERN.split(comment.strip().strip("()")):
+            if not extract_interjections(segment):
+                lost += 1
+    return lost
+
+
+def benchmark(comments: list[str], repeat: int) -> None:
+    legacy = [extract_spoken_comments_legacy(comment) for comment in comments]
+    current = [extract_interjections(comment) for comment in comments]
+
+    arten = Counter(
+        interjection["art"]
+        for interjections in current
+        for interjection in interjections
+    )
+    spoken = arten["zwischenruf"]
+    legacy_spoken = sum(len(interjections) for interjections in legacy)
+    # comments where the two disagree on the spoken interjections, e.g. names with a
+    # hyphen that the legacy split cuts apart or prefixes like "Abg." it keeps
+    differing = sum(
+        [(i["commentator"], i["fraktion"]) for i in old]
+        != [(i["commentator"], i["fraktion"]) for i in new if i["art"] == "zwischenruf"]
+        for old, new in zip(legacy, current)
+    )
+
+    print(f"{len(comments)} comments")
+    print(f"legacy:  {legacy_spoken} spoken interjections")
+    print(f"current: {spoken} spoken interjections, {sum(arten.values())} in total")
+    for art, count in arten.most_common():
+        print(f"    {art:<12} {count}")
+    print(f"comments with differing spoken interjections: {differing}")
+    print(f"segments without an interjection: {count_lost_segments(comments)}")
+
+    for name, function in (
+        ("legacy", extract_spoken_comments_legacy),
+        ("current", extract_interjections),
+    ):
+        seconds = min(
+            timeit.repeat(
+                lambda: [function(comment) for comment in comments],
+                number=1,
+                repeat=repeat,
+            )
+        )
+        print(
+            f"{name:>8}: {seconds:.3f}s, "
+            f"{seconds / len(comments) * 1e6:.2f} µs per comment"
+        )
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="compare the legacy and the single-pass interjection extractor"
+    )
+    argument_parser.add_argument(
+        "xml_directory", nargs="?", help="protocols to read, synthetic ones if omitted"
+    )
+    argument_parser.add_argument("--sitzungen", type=int, default=100)
+    argument_parser.add_argument("--repeat", type=int, default=5)
+    args = argument_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_directory:
+        xml_directory = args.xml_directory
+        if xml_directory is None:
+            xml_directory = corpus_directory
+            generate_corpus(corpus_directory, num_sitzungen=args.sitzungen)
+        comments = collect_comments(sorted(Path(xml_directory).rglob("*.xml")))
+
+    benchmark(comments, args.repeat)
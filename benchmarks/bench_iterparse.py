@@ -0,0 +1,85 @@
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.synthetic_corpus import generate_corpus
+from src.preprocessing.parse_data import PlenarprotokollXMLParser
+
+
+# resident set size of the current process in bytes (linux only)
+def current_rss() -> int:
+    with open("/proc/self/statm", "rt") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+# run in a fresh process per file and mode so the peak RSS of one run doesn't hide the
+# next, returns the seconds, the peak RSS above the RSS before parsing and the peak of
+# the python allocations, the latter measured in a second run since tracing slows it
+def measure(file_path: str, iterparse: bool) -> tuple[float, int, int]:
+    baseline = current_rss()
+    start = time.perf_counter()
+    PlenarprotokollXMLParser(iterparse=iterparse).get_xml_content(file_path)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is reported in kilobytes on linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 - baseline
+
+    tracemalloc.start()
+    PlenarprotokollXMLParser(iterparse=iterparse).get_xml_content(file_path)
+    _, peak_allocated = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, max(peak_rss, 0), peak_allocated
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="peak RSS and throughput of ET.parse vs. iterparse per file"
+    )
+    argument_parser.add_argument(
+        "xml_directory", nargs="?", help="protocols to read, synthetic ones if omitted"
+    )
+    argument_parser.add_argument(
+        "--largest", type=int, default=5, help="number of largest files to measure"
+    )
+    args = argument_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_directory:
+        xml_directory = args.xml_directory
+        if xml_directory is None:
+            xml_directory = corpus_directory
+            generate_corpus(
+                corpus_directory,
+                num_sitzungen=args.largest,
+                tagesordnungspunkte=60,
+                reden_per_top=15,
+            )
+
+        pathlist = sorted(
+            Path(xml_directory).rglob("*.xml"),
+            key=lambda path: path.stat().st_size,
+            reverse=True,
+        )[: args.largest]
+
+        context = multiprocessing.get_context("spawn")
+        print(
+            f"{'file':>12} {'MB':>6} {'mode':>9} {'seconds':>8} {'MB/s':>6} "
+            f"{'peak RSS':>9} {'peak alloc':>10}"
+        )
+        for path in pathlist:
+            size = os.path.getsize(path)
+            for iterparse in (False, True):
+                with context.Pool(1, maxtasksperchild=1) as pool:
+                    elapsed, rss, allocated = pool.apply(
+                        measure, (str(path), iterparse)
+                    )
+                print(
+                    f"{path.name:>12} {size / 1e6:6.1f} "
+                    f"{'iterparse' if iterparse else 'parse':>9} {elapsed:8.3f} "
+                    f"{size / 1e6 / elapsed:6.1f} {rss / 1e6:7.1f}MB "
+                    f"{allocated / 1e6:8.1f}MB"
+                )
@@ -0,0 +1,72 @@
+import argparse
+import re
+import tempfile
+import timeit
+import xml.etree.ElementTree as ET
+
+from benchmarks.synthetic_corpus import generate_corpus
+from src.preprocessing.normalize import default_normalizer
+
+
+# the previous implementation, looking up four patterns and scanning the text four times
+def remove_bad_chars_regex(text: str) -> str:
+    sub_map = {
+        r"[\u00A0]": " ",
+        r"[\u202F]": "",
+        r"[\u2013]": "-",
+        r"[\u201c\u201e]": "'",
+    }
+
+    for pattern, substitute in sub_map.items():
+        text = re.compile(pattern=pattern).sub(substitute, text)
+
+    return text
+
+
+# every text the parser normalizes: paragraphs, comments and name elements
+def collect_texts(file_path: str) -> list[str]:
+    root = ET.parse(file_path).getroot()
+    texts = []
+    for rede in root.iter("rede"):
+        for element in rede.iter():
+            if element.tag in ("p", "kommentar", "vorname", "nachname", "titel"):
+                if element.text is not None:
+                    texts.append(element.text)
+    return texts
+
+
+def benchmark(texts: list[str], repeat: int) -> None:
+    for text in texts:
+        assert remove_bad_chars_regex(text) == default_normalizer.normalize(text)
+
+    for name, function in [
+        ("regex", remove_bad_chars_regex),
+        ("single pass", default_normalizer.normalize),
+    ]:
+        seconds = min(
+            timeit.repeat(
+                lambda: [function(text) for text in texts], number=1, repeat=repeat
+            )
+        )
+        print(
+            f"{name:>11}: {seconds * 1e6 / len(texts):6.2f} µs per paragraph "
+            f"({len(texts)} paragraphs, {seconds:.3f}s)"
+        )
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="per-paragraph cost of the text normalization"
+    )
+    argument_parser.add_argument(
+        "xml_file", nargs="?", help="protocol to read, a synthetic one if omitted"
+    )
+    argument_parser.add_argument("--repeat", type=int, default=5)
+    args = argument_parser.parse_args()
+
+    if args.xml_file is not None:
+        benchmark(collect_texts(args.xml_file), args.repeat)
+    else:
+        with tempfile.TemporaryDirectory() as corpus_directory:
+            (file_path,) = generate_corpus(corpus_directory, num_sitzungen=1)
+            benchmark(collect_texts(file_path), args.repeat)
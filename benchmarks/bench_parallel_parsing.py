@@ -0,0 +1,47 @@
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic_corpus import generate_corpus
+from src.preprocessing.parse_data import PlenarprotokollXMLParser
+
+
+def run_parser(pathlist: list[Path], workers: int | None) -> tuple[float, dict]:
+    parser = PlenarprotokollXMLParser()
+    start = time.perf_counter()
+    parser.parse_files(pathlist, workers=workers)
+    elapsed = time.perf_counter() - start
+    return elapsed, {
+        "data": parser.data,
+        "redner": parser.redner,
+        "rollen": parser.rollen,
+    }
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="compare serial and multi-process parsing on a synthetic corpus"
+    )
+    argument_parser.add_argument("--sitzungen", type=int, default=200)
+    argument_parser.add_argument(
+        "--workers", type=int, nargs="+", default=[2, 4, os.cpu_count()]
+    )
+    args = argument_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_directory:
+        generate_corpus(corpus_directory, num_sitzungen=args.sitzungen)
+        pathlist = sorted(Path(corpus_directory).rglob("*.xml"))
+
+        serial_time, serial_result = run_parser(pathlist, workers=None)
+        print(f"serial:     {serial_time:7.2f}s")
+
+        for workers in sorted(set(args.workers)):
+            parallel_time, parallel_result = run_parser(pathlist, workers=workers)
+            # the merged result has to be identical to the serial run, including ids
+            identical = parallel_result == serial_result
+            print(
+                f"{workers:2d} workers: {parallel_time:7.2f}s "
+                f"(speedup {serial_time / parallel_time:4.2f}x, identical: {identical})"
+            )
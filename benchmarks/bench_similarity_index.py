@@ -0,0 +1,111 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.synthetic_corpus import generate_corpus
+from src.analysis.similarity_index import (
+    decode_signature,
+    duplicate_clusters,
+    estimate_similarity,
+    similar_reden,
+    update_similarity_index,
+)
+from src.sqlite.incremental_load import update_database
+from src.sqlite.setup_db import setup_database
+
+
+# copy reden over other reden with one word in a hundred replaced, so the corpus
+# contains known near-duplicates across sessions and speakers
+def plant_duplicates(database_path: str, count: int, seed: int) -> list[tuple]:
+    generator = random.Random(seed)
+    with sqlite3.connect(database_path) as conn:
+        rede_ids = [row[0] for row in conn.execute("SELECT rede_id FROM reden")]
+        sampled = generator.sample(rede_ids, 2 * count)
+        planted = []
+        for source, target in zip(sampled[::2], sampled[1::2]):
+            words = (
+                conn.execute("SELECT text FROM reden WHERE rede_id = ?", (source,))
+                .fetchone()[0]
+                .split(" ")
+            )
+            for index in generator.sample(range(len(words)), len(words) // 100):
+                words[index] = "geändert"
+            conn.execute(
+                "UPDATE reden SET text = ? WHERE rede_id = ?", (" ".join(words), target)
+            )
+            planted.append((source, target))
+        conn.commit()
+    return planted
+
+
+# the baseline the index replaces, comparing the signature of one rede to all others
+def linear_scan(database_path: str, rede_id: str, threshold: float) -> list[str]:
+    with sqlite3.connect(database_path) as conn:
+        signatures = {
+            other: decode_signature(blob)
+            for other, blob in conn.execute(
+                "SELECT rede_id, signatur FROM minhash_signaturen"
+            )
+        }
+    signature = signatures.pop(rede_id)
+    return [
+        other
+        for other, other_signature in signatures.items()
+        if estimate_similarity(signature, other_signature) >= threshold
+    ]
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="time the similarity index on a synthetic corpus"
+    )
+    argument_parser.add_argument("--sitzungen", type=int, default=200)
+    argument_parser.add_argument("--duplicates", type=int, default=50)
+    argument_parser.add_argument("--lookups", type=int, default=100)
+    argument_parser.add_argument("--workers", type=int, default=None)
+    argument_parser.add_argument("--threshold", type=float, default=0.8)
+    args = argument_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_directory:
+        corpus_directory = os.path.join(work_directory, "xml")
+        database_path = os.path.join(work_directory, "data.db")
+        generate_corpus(corpus_directory, num_sitzungen=args.sitzungen)
+        with contextlib.redirect_stdout(io.StringIO()):
+            setup_database(database_path)
+            update_database(corpus_directory, database_path)
+        planted = plant_duplicates(database_path, args.duplicates, seed=0)
+
+        start = time.perf_counter()
+        signed = update_similarity_index(database_path, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"signing:      {elapsed:7.2f}s for {signed} reden")
+
+        start = time.perf_counter()
+        update_similarity_index(database_path, workers=args.workers)
+        print(f"no changes:   {time.perf_counter() - start:7.2f}s")
+
+        found = sum(
+            target in dict(similar_reden(database_path, source, args.threshold))
+            for source, target in planted
+        )
+        print(f"recall:       {found} of {len(planted)} planted duplicates found")
+
+        rede_ids = [source for source, _ in planted][: args.lookups]
+        for name, function in (("lsh", similar_reden), ("linear scan", linear_scan)):
+            start = time.perf_counter()
+            for rede_id in rede_ids:
+                function(database_path, rede_id, args.threshold)
+            elapsed = (time.perf_counter() - start) / len(rede_ids)
+            print(f"{name + ':':<13} {elapsed * 1e3:7.2f} ms per lookup")
+
+        start = time.perf_counter()
+        clusters = duplicate_clusters(database_path, args.threshold)
+        print(
+            f"clusters:     {time.perf_counter() - start:7.2f}s, {len(clusters)} "
+            f"clusters with {sum(len(cluster) for cluster in clusters)} reden"
+        )
@@ -0,0 +1,215 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.synthetic_corpus import generate_corpus
+from src.analysis.analyze_data import DataAnalyzer
+from src.analysis.corpus_statistics import corpus_statistics
+from src.fetch_data.archive import list_protokolle
+from src.instrumentation.run_report import run_report
+from src.preprocessing.parse_data import PlenarprotokollXMLParser
+from src.sqlite.load_data_into_db import load_sitzungen_into_db
+from src.sqlite.setup_db import setup_database
+
+STAGES = ["parse", "load", "analyze", "statistics"]
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(__file__), "results")
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# time a single stage, the pipeline prints progress which is swallowed here
+def timed(function, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+# stream the parsed sitzungen into a fresh database while exporting the json, tokenize
+# and count the words of the json with DataAnalyzer and compute the corpus statistics
+# from the database, the same path 03_parse_and_load_data.py takes, parsing and loading
+# are interleaved so the parse time is the parse timer of the run report and the load
+# time is the rest of the stream
+def run_pipeline(
+    xml_directory_path: str, stages: list[str], workers: int | None
+) -> dict:
+    with tempfile.TemporaryDirectory() as work_directory:
+        database_path = os.path.join(work_directory, "data.db")
+        seconds = dict()
+
+        seconds["setup"] = timed(setup_database, database_path)
+        parse_seconds = run_report.stages["parse"]["seconds"]
+        stream_seconds = timed(
+            load_sitzungen_into_db,
+            PlenarprotokollXMLParser().iter_sitzungen(
+                list_protokolle(xml_directory_path), workers=workers
+            ),
+            database_path,
+            json_directory_path=work_directory,
+        )
+        seconds["parse"] = run_report.stages["parse"]["seconds"] - parse_seconds
+        seconds["load"] = stream_seconds - seconds["parse"]
+        if "analyze" in stages:
+
+            def analyze() -> None:
+                analyzer = DataAnalyzer(os.path.join(work_directory, "data.json"))
+                analyzer.word_frequency_dist(analyzer.tokenize_words("text"))
+
+            seconds["analyze"] = timed(analyze)
+        if "statistics" in stages:
+            seconds["statistics"] = timed(corpus_statistics, database_path)
+
+        return {
+            "seconds": seconds,
+            "json_bytes": os.path.getsize(os.path.join(work_directory, "data.json")),
+        }
+
+
+def run_scale(
+    num_sitzungen: int, stages: list[str], repeat: int, seed: int, workers: int | None
+) -> dict:
+    with tempfile.TemporaryDirectory() as corpus_directory:
+        file_paths = generate_corpus(corpus_directory, num_sitzungen, seed=seed)
+        xml_bytes = sum(os.path.getsize(file_path) for file_path in file_paths)
+
+        runs = []
+        for _ in range(repeat):
+            run_report.stages.clear()
+            run_report.counters.clear()
+            run = run_pipeline(corpus_directory, stages, workers)
+            run["report"] = {
+                "stages": dict(run_report.stages),
+                "counters": dict(run_report.counters),
+            }
+            runs.append(run)
+
+    # the fastest run is the least disturbed by other processes
+    best = {
+        stage: min(run["seconds"][stage] for run in runs)
+        for stage in runs[0]["seconds"]
+    }
+    return {
+        "sitzungen": num_sitzungen,
+        "xml_bytes": xml_bytes,
+        "json_bytes": runs[0]["json_bytes"],
+        "seconds": best,
+        "xml_mb_per_second": xml_bytes / 1e6 / best["parse"],
+        "counters": runs[0]["report"]["counters"],
+        "runs": runs,
+    }
+
+
+# compare the best times per scale and stage against a stored result, a stage is
+# reported as a regression if it got slower than the baseline by more than threshold
+def compare_results(baseline: dict, current: dict, threshold: float) -> bool:
+    baseline_scales = {
+        result["sitzungen"]: result["seconds"] for result in baseline["results"]
+    }
+    regression = False
+    print(f"{'sitzungen':>9} {'stage':>8} {'baseline':>9} {'current':>9} {'ratio':>6}")
+    for result in current["results"]:
+        baseline_seconds = baseline_scales.get(result["sitzungen"], {})
+        for stage, seconds in result["seconds"].items():
+            if stage not in baseline_seconds:
+                continue
+            ratio = seconds / baseline_seconds[stage]
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  REGRESSION"
+                regression = True
+            print(
+                f"{result['sitzungen']:>9} {stage:>8} {baseline_seconds[stage]:>8.2f}s "
+                f"{seconds:>8.2f}s {ratio:>5.2f}x{flag}"
+            )
+    return regression
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="time parsing, loading and analysis end-to-end on synthetic corpora"
+    )
+    argument_parser.add_argument(
+        "--sitzungen", type=int, nargs="+", default=[10, 100, 1000]
+    )
+    argument_parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=STAGES,
+        default=STAGES,
+        help="parse and load always run since the sitzungen stream from the parser "
+        "into the database and the other stages read their output",
+    )
+    argument_parser.add_argument("--repeat", type=int, default=1)
+    argument_parser.add_argument("--seed", type=int, default=0)
+    argument_parser.add_argument("--workers", type=int, default=None)
+    argument_parser.add_argument("--output", default=RESULTS_DIRECTORY)
+    argument_parser.add_argument(
+        "--compare", help="result file to compare against, e.g. a stored baseline"
+    )
+    argument_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown reported as a regression",
+    )
+    args = argument_parser.parse_args()
+
+    started = datetime.now()
+    results = {
+        "started": started.isoformat(),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "workers": args.workers,
+        "results": [],
+    }
+    for num_sitzungen in args.sitzungen:
+        result = run_scale(
+            num_sitzungen, args.stages, args.repeat, args.seed, args.workers
+        )
+        results["results"].append(result)
+        print(
+            f"{num_sitzungen:>5} sitzungen: "
+            + ", ".join(
+                f"{stage} {seconds:.2f}s"
+                for stage, seconds in result["seconds"].items()
+            )
+            + f" ({result['xml_mb_per_second']:.1f} MB/s parsed)"
+        )
+    # ru_maxrss is reported in kilobytes on linux
+    results["peak_rss_bytes"] = (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    )
+
+    os.makedirs(args.output, exist_ok=True)
+    result_path = os.path.join(args.output, f"{started:%Y%m%d_%H%M%S}.json")
+    with open(result_path, "wt", encoding="utf-8") as file:
+        json.dump(results, file, indent=4)
+    print(f"results written to {result_path}")
+
+    if args.compare is not None:
+        with open(args.compare, "rt", encoding="utf-8") as file:
+            baseline = json.load(file)
+        if compare_results(baseline, results, args.threshold):
+            sys.exit(1)
@@ -0,0 +1,273 @@
+import argparse
+import os
+import random
+import xml.etree.ElementTree as ET
+
+FRAKTIONEN = [
+    "SPD",
+    "CDU/CSU",
+    "BÜNDNIS 90/DIE GRÜNEN",
+    "FDP",
+    "AfD",
+    "DIE LINKE",
+]
+
+VORNAMEN = ["Anna", "Jens", "Katrin", "Lars", "Marie", "Olaf", "Petra", "Stefan"]
+NACHNAMEN = ["Bauer", "Fischer", "Hoffmann", "Klein", "Meyer", "Schulz", "Wagner"]
+ROLLEN = [
+    "Bundesminister der Finanzen",
+    "Bundesministerin   des Innern und für Heimat",
+    "Parl. Staatssekretär bei der Bundesministerin für Bildung und Forschung",
+    "Bundeskanzler",
+]
+WOERTER = (
+    "Damen Herren Kolleginnen Kollegen Bundesregierung Haushalt Gesetz Entwurf "
+    "Antrag Bürgerinnen Bürger Zukunft Klimaschutz Energie Wirtschaft Rente Schule "
+    "Verantwortung Demokratie Europa Sicherheit Freiheit Arbeit heute wir müssen "
+    "dieses Land braucht endlich eine Politik die für alle Menschen funktioniert"
+).split()
+
+
+def _sentence(rng: random.Random, min_words: int = 6, max_words: int = 25) -> str:
+    words = rng.choices(WOERTER, k=rng.randint(min_words, max_words))
+    return " ".join(words).capitalize() + "."
+
+
+def _speaker_pool(rng: random.Random, num_speakers: int) -> list[dict]:
+    speakers = []
+    for index in range(num_speakers):
+        speaker = {
+            "id": str(11000000 + index),
+            "vorname": rng.choice(VORNAMEN),
+            "nachname": rng.choice(NACHNAMEN),
+            "fraktion": rng.choice(FRAKTIONEN),
+        }
+        if rng.random() < 0.15:
+            speaker["titel"] = "Dr."
+        if rng.random() < 0.1:
+            speaker["rolle"] = rng.choice(ROLLEN)
+        speakers.append(speaker)
+    return speakers
+
+
+# fraktionen with the article the protocols use for them
+FRAKTIONEN_DATIV = {
+    "SPD": "der SPD",
+    "CDU/CSU": "der CDU/CSU",
+    "BÜNDNIS 90/DIE GRÜNEN": "dem BÜNDNIS 90/DIE GRÜNEN",
+    "FDP": "der FDP",
+    "AfD": "der AfD",
+    "DIE LINKE": "der LINKEN",
+}
+FRAKTIONEN_GENITIV = {
+    **FRAKTIONEN_DATIV,
+    "BÜNDNIS 90/DIE GRÜNEN": "des BÜNDNISSES 90/DIE GRÜNEN",
+}
+
+# reactions of whole fraktionen as they appear in the kommentar elements
+REAKTIONEN = [
+    "Beifall bei {fraktion}",
+    "Beifall bei {fraktion} sowie bei Abgeordneten {andere}",
+    "Beifall bei Abgeordneten {andere}",
+    "Heiterkeit bei {fraktion}",
+    "Lachen bei {fraktion}",
+    "Widerspruch bei {fraktion}",
+    "Zuruf von {fraktion}",
+    "Zurufe von {fraktion}",
+    "Lebhafter Beifall bei {fraktion}",
+    "Anhaltender Beifall bei {fraktion} und {zweite}",
+    "Vereinzelt Beifall bei {fraktion}",
+    "Erneuter Beifall bei {fraktion}",
+    "Weiterer Zuruf von {fraktion}",
+    "Heiterkeit und Beifall bei {fraktion}",
+    "Lachen und Beifall bei {fraktion}",
+]
+# the forms spoken interjections of members are introduced with, {abgeordneter} is the
+# name and fraktion in brackets
+ZWISCHENRUFE = [
+    "{abgeordneter}: {text}",
+    "Abg. {abgeordneter}: {text}",
+    "Gegenruf des Abg. {abgeordneter}: {text}",
+]
+ZURUFE = [
+    "Zuruf des Abg. {abgeordneter}",
+    "Weiterer Zuruf des Abg. {abgeordneter}",
+]
+
+
+def _abgeordneter(speaker: dict) -> str:
+    name = f"{speaker['vorname']} {speaker['nachname']}"
+    if "titel" in speaker:
+        name = f"{speaker['titel']} {name}"
+    return f"{name} [{speaker['fraktion']}]"
+
+
+def _kommentar(rng: random.Random, speakers: list[dict]) -> str:
+    parts = []
+    for _ in range(rng.randint(1, 2)):
+        parts.append(
+            rng.choice(REAKTIONEN).format(
+                fraktion=FRAKTIONEN_DATIV[rng.choice(FRAKTIONEN)],
+                zweite=FRAKTIONEN_DATIV[rng.choice(FRAKTIONEN)],
+                andere=FRAKTIONEN_GENITIV[rng.choice(FRAKTIONEN)],
+            )
+        )
+    for _ in range(rng.choices([0, 1, 2, 3], weights=[4, 4, 2, 1])[0]):
+        abgeordneter = _abgeordneter(rng.choice(speakers))
+        if rng.random() < 0.2:
+            # interjections without a quoted text carry no colon
+            parts.append(rng.choice(ZURUFE).format(abgeordneter=abgeordneter))
+        else:
+            parts.append(
+                rng.choices(ZWISCHENRUFE, weights=[8, 1, 1])[0].format(
+                    abgeordneter=abgeordneter, text=_sentence(rng, 2, 8)
+                )
+            )
+    rng.shuffle(parts)
+    # the protocols separate interjections with an en dash and use typographic quotes
+    return "(" + " – ".join(parts) + ")"
+
+
+def _add_rede(
+    parent: ET.Element,
+    rng: random.Random,
+    rede_id: str,
+    speaker: dict,
+    speakers: list[dict],
+    paragraphs: int,
+) -> None:
+    rede = ET.SubElement(parent, "rede", id=rede_id)
+    redner_paragraph = ET.SubElement(rede, "p", klasse="redner")
+    redner = ET.SubElement(redner_paragraph, "redner", id=speaker["id"])
+    name = ET.SubElement(redner, "name")
+    if "titel" in speaker:
+        ET.SubElement(name, "titel").text = speaker["titel"]
+    ET.SubElement(name, "vorname").text = speaker["vorname"]
+    ET.SubElement(name, "nachname").text = speaker["nachname"]
+    if "rolle" in speaker:
+        rolle = ET.SubElement(name, "rolle")
+        ET.SubElement(rolle, "rolle_lang").text = speaker["rolle"]
+        ET.SubElement(rolle, "rolle_kurz").text = speaker["rolle"].split()[0]
+    else:
+        ET.SubElement(name, "fraktion").text = speaker["fraktion"]
+    redner.tail = f"{speaker['vorname']} {speaker['nachname']}:"
+
+    for _ in range(paragraphs):
+        paragraph = ET.SubElement(rede, "p", klasse="J")
+        paragraph.text = " ".join(
+            _sentence(rng) for _ in range(rng.randint(1, 4))
+        ).replace("Zukunft", "„Zukunft“")
+        if rng.random() < 0.4:
+            ET.SubElement(rede, "kommentar").text = _kommentar(rng, speakers)
+
+
+def generate_sitzung(
+    wahlperiode: int,
+    sitzung_nr: int,
+    speakers: list[dict],
+    rng: random.Random,
+    tagesordnungspunkte: int = 8,
+    reden_per_top: int = 6,
+    paragraphs_per_rede: int = 8,
+) -> ET.ElementTree:
+    root = ET.Element(
+        "dbtplenarprotokoll",
+        {"wahlperiode": str(wahlperiode), "sitzung-nr": str(sitzung_nr)},
+    )
+    vorspann = ET.SubElement(root, "vorspann")
+    kopfdaten = ET.SubElement(vorspann, "kopfdaten")
+    veranstaltungsdaten = ET.SubElement(kopfdaten, "veranstaltungsdaten")
+    ET.SubElement(veranstaltungsdaten, "ort").text = "Berlin"
+    day = (sitzung_nr % 28) + 1
+    month = (sitzung_nr // 28) % 12 + 1
+    ET.SubElement(
+        veranstaltungsdaten, "datum", date=f"{day:02d}.{month:02d}.2024"
+    ).text = f"{day}. {month}. 2024"
+    inhaltsverzeichnis = ET.SubElement(vorspann, "inhaltsverzeichnis")
+    for _ in range(tagesordnungspunkte * 4):
+        ET.SubElement(inhaltsverzeichnis, "ivz-eintrag").text = _sentence(rng)
+
+    sitzungsverlauf = ET.SubElement(root, "sitzungsverlauf")
+    ET.SubElement(
+        sitzungsverlauf, "sitzungsbeginn", {"sitzung-start-uhrzeit": "9:00"}
+    ).text = "Beginn: 9:00 Uhr"
+
+    for top_index in range(1, tagesordnungspunkte + 1):
+        tagesordnungspunkt = ET.SubElement(
+            sitzungsverlauf,
+            "tagesordnungspunkt",
+            {"top-id": f"Tagesordnungspunkt {top_index}"},
+        )
+        ET.SubElement(tagesordnungspunkt, "p", klasse="T_NaS").text = _sentence(rng)
+        for rede_index in range(1, reden_per_top + 1):
+            rede_id = f"ID{wahlperiode}{sitzung_nr:03d}{top_index:02d}{rede_index:02d}"
+            _add_rede(
+                tagesordnungspunkt,
+                rng,
+                rede_id,
+                rng.choice(speakers),
+                speakers,
+                paragraphs_per_rede,
+            )
+
+    ET.SubElement(
+        sitzungsverlauf, "sitzungsende", {"sitzung-ende-uhrzeit": "18:30"}
+    ).text = "Schluss: 18:30 Uhr"
+    anlagen = ET.SubElement(root, "anlagen")
+    for _ in range(tagesordnungspunkte * 10):
+        ET.SubElement(anlagen, "p").text = _sentence(rng)
+
+    return ET.ElementTree(root)
+
+
+def generate_corpus(
+    output_directory_path: str,
+    num_sitzungen: int,
+    wahlperiode: int = 20,
+    num_speakers: int = 200,
+    seed: int = 0,
+    **sitzung_options,
+) -> list[str]:
+    rng = random.Random(seed)
+    speakers = _speaker_pool(rng, num_speakers)
+    os.makedirs(output_directory_path, exist_ok=True)
+
+    file_paths = []
+    for sitzung_nr in range(1, num_sitzungen + 1):
+        tree = generate_sitzung(
+            wahlperiode, sitzung_nr, speakers, rng, **sitzung_options
+        )
+        file_path = os.path.join(
+            output_directory_path, f"{wahlperiode}{sitzung_nr:03d}.xml"
+        )
+        tree.write(file_path, encoding="utf-8", xml_declaration=True)
+        file_paths.append(file_path)
+
+    return file_paths
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(
+        description="write a synthetic corpus of Plenarprotokoll XML files"
+    )
+    argument_parser.add_argument("output_directory")
+    argument_parser.add_argument("--sitzungen", type=int, default=10)
+    argument_parser.add_argument("--wahlperiode", type=int, default=20)
+    argument_parser.add_argument("--speakers", type=int, default=200)
+    argument_parser.add_argument("--seed", type=int, default=0)
+    argument_parser.add_argument("--tagesordnungspunkte", type=int, default=8)
+    argument_parser.add_argument("--reden-per-top", type=int, default=6)
+    argument_parser.add_argument("--paragraphs-per-rede", type=int, default=8)
+    args = argument_parser.parse_args()
+
+    file_paths = generate_corpus(
+        args.output_directory,
+        num_sitzungen=args.sitzungen,
+        wahlperiode=args.wahlperiode,
+        num_speakers=args.speakers,
+        seed=args.seed,
+        tagesordnungspunkte=args.tagesordnungspunkte,
+        reden_per_top=args.reden_per_top,
+        paragraphs_per_rede=args.paragraphs_per_rede,
+    )
+    print(f"wrote {len(file_paths)} files to {args.output_directory}")
@@ -1,23 +1,30 @@
 import nltk, json
+from collections.abc import Iterator
 from nltk.tokenize import word_tokenize, sent_tokenize
 
+from src.analysis.token_cache import TokenCache
+
 
 class DataAnalyzer:
     def __init__(self, data_path: str):
         with open(data_path, "r", encoding="utf-8") as file:
             self.data = json.load(file)
 
+    # collect the strings stored under `key`, e.g. the paragraphs of the reden and the
+    # texts of the kommentare for "text"
     def extract_paragraphs(self, data: dict | list, key: str):
         paragraphs = []
         if isinstance(data, dict):
-            for key, value in data.items():
-                if key == key and isinstance(value, str):
+            for child_key, value in data.items():
+                if child_key == key and isinstance(value, str):
                     paragraphs.append(value)
+                elif child_key == key and isinstance(value, list):
+                    paragraphs.extend(item for item in value if isinstance(item, str))
                 else:
-                    paragraphs.extend(self.extract_paragraphs(value))
+                    paragraphs.extend(self.extract_paragraphs(value, key))
         elif isinstance(data, list):
             for item in data:
-                paragraphs.extend(self.extract_paragraphs(item))
+                paragraphs.extend(self.extract_paragraphs(item, key))
 
         return paragraphs
 
@@ -31,25 +38,32 @@ class DataAnalyzer:
                 tokens.extend(words)
         return tokens
 
-    def word_frequency_dist(self, tokens: list):
-        word_frequency = nltk.FreqDist(tokens)
+    # yield the id and the joined text of every rede in the loaded data
+    def iter_reden(self) -> Iterator[tuple[str, str]]:
+        for sitzung in self.data.values():
+            for tagesordnungspunkt in sitzung["inhalt"].values():
+                for rede_id, rede in tagesordnungspunkt.items():
+                    yield rede_id, "\n".join(rede["text"])
 
-        # TODO: remove stopwords
-        return word_frequency
+    # tokenize only the reden missing from the cache, in batches across a process pool,
+    # and stream the token lists back rede by rede instead of building one big list
+    def tokenize_words_cached(
+        self, cache_path: str, workers: int | None = None
+    ) -> Iterator[list[str]]:
+        cache = TokenCache(cache_path)
+        try:
+            cache.update(self.iter_reden(), workers=workers)
+            # the cache may be shared with other data, only the loaded reden are read
+            rede_ids = [rede_id for rede_id, _ in self.iter_reden()]
+            for _, tokens in cache.iter_tokens(rede_ids):
+                yield tokens
+        finally:
+            cache.close()
 
-    def num_comments_per_speaker(self, data: dict | list, target_redner: str):
-        comments = 0
-        if isinstance(data, dict):
-            for key, value in data.items():
-                comments += self.num_comments_per_speaker(value, target_redner)
-        elif isinstance(data, list):
-            for item in data:
-                if item.get("redner") == target_redner:
-                    for item in data:
-                        if list(item.keys())[0] == "kommentar":
-                            comments += 1
-                else:
-                    for key, value in item.items():
-                        comments += self.num_comments_per_speaker(value, target_redner)
+    # stopwords are compared case-insensitively, e.g. term_index.german_stopwords()
+    def word_frequency_dist(self, tokens: list, stopwords: set[str] | None = None):
+        if stopwords is not None:
+            tokens = (token for token in tokens if token.lower() not in stopwords)
+        word_frequency = nltk.FreqDist(tokens)
 
-        return comments
+        return word_frequency
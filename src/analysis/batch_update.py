@@ -0,0 +1,90 @@
+import sqlite3
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+
+# split a stream of (key, text) pairs into lists of batch_size pairs
+def batched(
+    items: Iterable[tuple[str, str]], batch_size: int
+) -> Iterator[list[tuple[str, str]]]:
+    items = iter(items)
+    while batch := list(islice(items, batch_size)):
+        yield batch
+
+
+# the text hashes stored for the given keys, keys without a stored hash are missing
+def read_hashes(
+    conn: sqlite3.Connection | sqlite3.Cursor,
+    table: str,
+    key_column: str,
+    keys: list[str],
+) -> dict[str, str]:
+    return dict(
+        conn.execute(
+            f"""SELECT {key_column}, text_hash FROM {table}
+            WHERE {key_column} IN ({", ".join("?" * len(keys))})""",
+            keys,
+        )
+    )
+
+
+# (key, current hash, text) of the texts in a batch whose hash differs from the stored
+# one
+def stale_items(
+    batch: list[tuple[str, str]],
+    stored_hashes: Callable[[list[str]], dict[str, str]],
+    text_hash: Callable[[str], str],
+) -> list[tuple[str, str, str]]:
+    hashes = stored_hashes([key for key, _ in batch])
+    stale = []
+    for key, text in batch:
+        current_hash = text_hash(text)
+        if hashes.get(key) != current_hash:
+            stale.append((key, current_hash, text))
+    return stale
+
+
+# bring values derived from texts up to date, e.g. token streams or minhash signatures,
+# only the texts whose hash changed are processed, process_batch turns the texts of a
+# batch into one value per text and runs in a worker process if there are several
+# workers, so it has to be picklable (e.g. a functools.partial of a module-level
+# function), at most workers * 2 batches are in flight and store is called with the
+# stale items and their values in batch order, returns the number of processed texts
+def update_stale(
+    batches: Iterable[list[tuple[str, str]]],
+    stored_hashes: Callable[[list[str]], dict[str, str]],
+    text_hash: Callable[[str], str],
+    process_batch: Callable[[list[str]], list],
+    store: Callable[[list[tuple[str, str, str]], list], None],
+    workers: int | None = None,
+) -> int:
+    processed = 0
+
+    if workers is None or workers <= 1:
+        for batch in batches:
+            stale = stale_items(batch, stored_hashes, text_hash)
+            if len(stale) > 0:
+                store(stale, process_batch([text for _, _, text in stale]))
+                processed += len(stale)
+        return processed
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for batch in batches:
+            stale = stale_items(batch, stored_hashes, text_hash)
+            if len(stale) == 0:
+                continue
+            texts = [text for _, _, text in stale]
+            pending.append((stale, executor.submit(process_batch, texts)))
+            if len(pending) >= workers * 2:
+                stale, future = pending.popleft()
+                store(stale, future.result())
+                processed += len(stale)
+        while pending:
+            stale, future = pending.popleft()
+            store(stale, future.result())
+            processed += len(stale)
+
+    return processed
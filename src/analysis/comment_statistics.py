@@ -0,0 +1,164 @@
+import sqlite3
+
+from src.sqlite.setup_db import bump_generation
+
+# aggregations over kommentare, each computed in a single query, the keys are the
+# names of the summary tables they are materialized into, the comment statistics count
+# the interjections of individual members, the reactions of whole fraktionen (rows
+# without kommentator) are counted separately in statistik_reaktionen_matrix
+statistics_queries = {
+    # comments received by every speaker during their speeches
+    "statistik_kommentare_redner": """
+        SELECT
+            redner.redner_id,
+            redner.vorname,
+            redner.nachname,
+            fraktionen.name AS fraktion,
+            COUNT(kommentare.kommentar_id) AS anzahl_kommentare,
+            COUNT(DISTINCT reden.rede_id) AS anzahl_reden
+        FROM reden
+        JOIN redner ON redner.redner_id = reden.redner_id
+        LEFT JOIN fraktionen ON fraktionen.fraktion_id = redner.fraktion_id
+        LEFT JOIN kommentare
+            ON kommentare.rede_id = reden.rede_id
+            AND kommentare.kommentator IS NOT NULL
+        GROUP BY redner.redner_id
+    """,
+    # comments made by every commentator
+    "statistik_kommentare_kommentatoren": """
+        SELECT
+            kommentator,
+            fraktion,
+            COUNT(*) AS anzahl_kommentare,
+            COUNT(DISTINCT rede_id) AS anzahl_reden
+        FROM kommentare
+        WHERE kommentator IS NOT NULL
+        GROUP BY kommentator, fraktion
+    """,
+    # comments made by every fraktion
+    "statistik_kommentare_fraktionen": """
+        SELECT
+            fraktion,
+            COUNT(*) AS anzahl_kommentare,
+            COUNT(DISTINCT kommentator) AS anzahl_kommentatoren
+        FROM kommentare
+        WHERE kommentator IS NOT NULL
+        GROUP BY fraktion
+    """,
+    # comments of every fraktion during speeches of members of every fraktion,
+    # speakers without a fraktion (e.g. members of the government) are grouped as NULL
+    "statistik_kommentare_matrix": """
+        SELECT
+            kommentare.fraktion AS kommentar_fraktion,
+            fraktionen.name AS redner_fraktion,
+            COUNT(*) AS anzahl_kommentare
+        FROM kommentare
+        JOIN reden ON reden.rede_id = kommentare.rede_id
+        JOIN redner ON redner.redner_id = reden.redner_id
+        LEFT JOIN fraktionen ON fraktionen.fraktion_id = redner.fraktion_id
+        WHERE kommentare.kommentator IS NOT NULL
+        GROUP BY kommentare.fraktion, redner.fraktion_id
+    """,
+    # comments per sitzung, to follow the trend over time
+    "statistik_kommentare_sitzungen": """
+        SELECT
+            sitzungen.sitzungs_id,
+            sitzungen.datum,
+            COUNT(kommentare.kommentar_id) AS anzahl_kommentare,
+            COUNT(DISTINCT reden.rede_id) AS anzahl_reden
+        FROM sitzungen
+        JOIN tagesordnungspunkte
+            ON tagesordnungspunkte.sitzungs_id = sitzungen.sitzungs_id
+        JOIN reden
+            ON reden.tagesordnungspunkt_id = tagesordnungspunkte.tagesordnungspunkt_id
+        LEFT JOIN kommentare
+            ON kommentare.rede_id = reden.rede_id
+            AND kommentare.kommentator IS NOT NULL
+        GROUP BY sitzungen.sitzungs_id
+    """,
+    # reactions like beifall or lachen of every fraktion during speeches of members of
+    # every fraktion, reactions of the whole plenum have no fraktion and are grouped as
+    # NULL like speakers without a fraktion
+    "statistik_reaktionen_matrix": """
+        SELECT
+            kommentare.art,
+            kommentare.fraktion AS reaktion_fraktion,
+            fraktionen.name AS redner_fraktion,
+            COUNT(*) AS anzahl_reaktionen
+        FROM kommentare
+        JOIN reden ON reden.rede_id = kommentare.rede_id
+        JOIN redner ON redner.redner_id = reden.redner_id
+        LEFT JOIN fraktionen ON fraktionen.fraktion_id = redner.fraktion_id
+        WHERE kommentare.kommentator IS NULL
+        GROUP BY kommentare.art, kommentare.fraktion, redner.fraktion_id
+    """,
+}
+
+
+# run one of the aggregations, or read its materialized summary table, which is only
+# as recent as the last refresh_comment_statistics
+def comment_statistics(
+    database_path: str, name: str, materialized: bool = False
+) -> list[dict]:
+    if name not in statistics_queries:
+        raise ValueError(f"unknown statistic {name}")
+
+    query = f"SELECT * FROM {name}" if materialized else statistics_queries[name]
+    with sqlite3.connect(database_path) as conn:
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute(query)]
+
+
+def comments_received_per_speaker(database_path: str, **kwargs) -> list[dict]:
+    return comment_statistics(database_path, "statistik_kommentare_redner", **kwargs)
+
+
+def comments_per_commentator(database_path: str, **kwargs) -> list[dict]:
+    return comment_statistics(
+        database_path, "statistik_kommentare_kommentatoren", **kwargs
+    )
+
+
+def comments_per_fraktion(database_path: str, **kwargs) -> list[dict]:
+    return comment_statistics(
+        database_path, "statistik_kommentare_fraktionen", **kwargs
+    )
+
+
+# nested as {kommentar_fraktion: {redner_fraktion: anzahl}}
+def interjection_matrix(database_path: str, **kwargs) -> dict[str, dict]:
+    matrix = dict()
+    for row in comment_statistics(
+        database_path, "statistik_kommentare_matrix", **kwargs
+    ):
+        matrix.setdefault(row["kommentar_fraktion"], {})[row["redner_fraktion"]] = row[
+            "anzahl_kommentare"
+        ]
+    return matrix
+
+
+def comments_per_sitzung(database_path: str, **kwargs) -> list[dict]:
+    return comment_statistics(database_path, "statistik_kommentare_sitzungen", **kwargs)
+
+
+# nested as {art: {reaktion_fraktion: {redner_fraktion: anzahl}}}
+def reaction_matrix(database_path: str, **kwargs) -> dict[str, dict]:
+    matrix = dict()
+    for row in comment_statistics(
+        database_path, "statistik_reaktionen_matrix", **kwargs
+    ):
+        matrix.setdefault(row["art"], {}).setdefault(row["reaktion_fraktion"], {})[
+            row["redner_fraktion"]
+        ] = row["anzahl_reaktionen"]
+    return matrix
+
+
+# recreate all summary tables in one transaction, meant to run after every load
+def refresh_comment_statistics(database_path: str) -> None:
+    with sqlite3.connect(database_path) as conn:
+        cursor = conn.cursor()
+        for name, query in statistics_queries.items():
+            cursor.execute(f"DROP TABLE IF EXISTS {name}")
+            cursor.execute(f"CREATE TABLE {name} AS {query}")
+        bump_generation(cursor)
+        conn.commit()
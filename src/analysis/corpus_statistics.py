@@ -0,0 +1,224 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+# rows fetched from sqlite per chunk, large tables are reduced chunk by chunk so only
+# the typed columns needed for the statistics are ever held for the whole corpus
+CHUNKSIZE = 50_000
+
+# the text of every rede is only read to count its words, the count replaces it in the
+# frame before the next chunk is read
+REDEN_QUERY = """
+    SELECT
+        reden.rede_id,
+        reden.redner_id,
+        reden.rollen_id,
+        tagesordnungspunkte.sitzungs_id,
+        reden.text
+    FROM reden
+    JOIN tagesordnungspunkte
+        ON tagesordnungspunkte.tagesordnungspunkt_id = reden.tagesordnungspunkt_id
+"""
+REDEN_DTYPES = {"redner_id": "int64", "rollen_id": "Int32", "sitzungs_id": "int32"}
+
+# interjections of members and reactions of fraktionen or the plenum are counted
+# separately, as in comment_statistics
+KOMMENTARE_QUERY = """
+    SELECT rede_id, kommentator IS NOT NULL AS zwischenruf FROM kommentare
+"""
+KOMMENTARE_DTYPES = {"zwischenruf": "bool"}
+
+REDNER_QUERY = """
+    SELECT
+        redner.redner_id,
+        redner.titel,
+        redner.vorname,
+        redner.nachname,
+        redner.fraktion_id,
+        fraktionen.name AS fraktion
+    FROM redner
+    LEFT JOIN fraktionen ON fraktionen.fraktion_id = redner.fraktion_id
+"""
+REDNER_DTYPES = {"redner_id": "int64", "fraktion_id": "Int32", "fraktion": "category"}
+
+SITZUNGEN_QUERY = "SELECT sitzungs_id, datum, start, ende FROM sitzungen"
+SITZUNGEN_DTYPES = {"sitzungs_id": "int32"}
+
+# hours and minutes of sitzung-start-uhrzeit and sitzung-ende-uhrzeit, e.g. "9:00" or
+# "13.05 Uhr"
+UHRZEIT_PATTERN = r"(\d{1,2})[:.](\d{2})"
+
+
+# one row per rede with the number of its words, indexed by rede_id
+def read_reden(conn: sqlite3.Connection, chunksize: int = CHUNKSIZE) -> pd.DataFrame:
+    frames = []
+    for chunk in pd.read_sql_query(
+        REDEN_QUERY, conn, chunksize=chunksize, dtype=REDEN_DTYPES
+    ):
+        chunk["woerter"] = chunk["text"].str.count(r"\S+").astype("int64")
+        frames.append(chunk.drop(columns="text"))
+    if not frames:
+        return pd.DataFrame(
+            {
+                "redner_id": pd.Series(dtype="int64"),
+                "rollen_id": pd.Series(dtype="Int32"),
+                "sitzungs_id": pd.Series(dtype="int32"),
+                "woerter": pd.Series(dtype="int64"),
+            },
+            index=pd.Index([], name="rede_id"),
+        )
+    return pd.concat(frames, ignore_index=True).set_index("rede_id")
+
+
+# the number of interjections and reactions per rede, every chunk is reduced to its
+# counts right away and the partial counts of reden spanning two chunks are added up
+def read_kommentare(
+    conn: sqlite3.Connection, chunksize: int = CHUNKSIZE
+) -> pd.DataFrame:
+    partials = []
+    for chunk in pd.read_sql_query(
+        KOMMENTARE_QUERY, conn, chunksize=chunksize, dtype=KOMMENTARE_DTYPES
+    ):
+        counts = pd.DataFrame(
+            {
+                "rede_id": chunk["rede_id"],
+                "zwischenrufe": chunk["zwischenruf"].astype("int32"),
+                "reaktionen": (~chunk["zwischenruf"]).astype("int32"),
+            }
+        )
+        partials.append(counts.groupby("rede_id", sort=False).sum())
+    if not partials:
+        return pd.DataFrame(
+            {
+                "zwischenrufe": pd.Series(dtype="int32"),
+                "reaktionen": pd.Series(dtype="int32"),
+            },
+            index=pd.Index([], name="rede_id"),
+        )
+    return pd.concat(partials).groupby(level="rede_id", sort=False).sum()
+
+
+def read_redner(conn: sqlite3.Connection) -> pd.DataFrame:
+    return pd.read_sql_query(REDNER_QUERY, conn, dtype=REDNER_DTYPES).set_index(
+        "redner_id"
+    )
+
+
+# the date as datetime and the duration of every sitzung in minutes, sitzungen ending
+# after midnight are counted into the next day
+def read_sitzungen(conn: sqlite3.Connection) -> pd.DataFrame:
+    sitzungen = pd.read_sql_query(SITZUNGEN_QUERY, conn, dtype=SITZUNGEN_DTYPES)
+    sitzungen["datum"] = pd.to_datetime(
+        sitzungen["datum"], format="%d.%m.%Y", errors="coerce"
+    )
+    minuten = dict()
+    for column in ("start", "ende"):
+        uhrzeit = sitzungen[column].str.extract(UHRZEIT_PATTERN).astype("float64")
+        minuten[column] = uhrzeit[0] * 60 + uhrzeit[1]
+    dauer = minuten["ende"] - minuten["start"]
+    sitzungen["dauer_minuten"] = dauer.where(dauer >= 0, dauer + 24 * 60)
+    return sitzungen.set_index("sitzungs_id")
+
+
+# numerator per 1000 words, NaN where there are no words
+def per_1000_woerter(anzahl: pd.Series, woerter: pd.Series) -> pd.Series:
+    return anzahl * 1000 / woerter.where(woerter > 0)
+
+
+# words, interjections and reactions of every rede, together with its speaker and their
+# fraktion
+def reden_statistics(
+    reden: pd.DataFrame, kommentare: pd.DataFrame, redner: pd.DataFrame
+) -> pd.DataFrame:
+    statistik = reden.join(kommentare, how="left")
+    statistik[["zwischenrufe", "reaktionen"]] = (
+        statistik[["zwischenrufe", "reaktionen"]].fillna(0).astype("int32")
+    )
+    for column in ("fraktion_id", "fraktion"):
+        statistik[column] = redner[column].reindex(statistik["redner_id"]).array
+    for column in ("zwischenrufe", "reaktionen"):
+        statistik[f"{column}_pro_1000_woerter"] = per_1000_woerter(
+            statistik[column], statistik["woerter"]
+        )
+    return statistik
+
+
+# sums over the reden of a group and the rates derived from them
+def group_statistics(grouped) -> pd.DataFrame:
+    statistik = grouped.agg(
+        anzahl_reden=("woerter", "size"),
+        woerter=("woerter", "sum"),
+        woerter_pro_rede=("woerter", "mean"),
+        woerter_pro_rede_median=("woerter", "median"),
+        zwischenrufe=("zwischenrufe", "sum"),
+        reaktionen=("reaktionen", "sum"),
+    )
+    for column in ("zwischenrufe", "reaktionen"):
+        statistik[f"{column}_pro_1000_woerter"] = per_1000_woerter(
+            statistik[column], statistik["woerter"]
+        )
+    return statistik
+
+
+def redner_statistics(
+    reden_statistik: pd.DataFrame, redner: pd.DataFrame
+) -> pd.DataFrame:
+    statistik = group_statistics(reden_statistik.groupby("redner_id", sort=True))
+    return redner.join(statistik, how="inner")
+
+
+# grouped by the id of the fraktion with its name, speakers without a fraktion (e.g.
+# members of the government) are grouped as NaN
+def fraktion_statistics(reden_statistik: pd.DataFrame) -> pd.DataFrame:
+    grouped = reden_statistik.groupby(
+        ["fraktion_id", "fraktion"], dropna=False, observed=True
+    )
+    statistik = group_statistics(grouped)
+    statistik.insert(0, "anzahl_redner", grouped["redner_id"].nunique())
+    return statistik
+
+
+# sitzungen without reden are kept with zero counts
+def sitzung_statistics(
+    reden_statistik: pd.DataFrame, sitzungen: pd.DataFrame
+) -> pd.DataFrame:
+    statistik = sitzungen.join(
+        group_statistics(reden_statistik.groupby("sitzungs_id", sort=True)),
+        how="left",
+    )
+    for column in ("anzahl_reden", "woerter", "zwischenrufe", "reaktionen"):
+        statistik[column] = statistik[column].fillna(0).astype("int64")
+    statistik["woerter_pro_minute"] = statistik["woerter"] / statistik[
+        "dauer_minuten"
+    ].where(statistik["dauer_minuten"] > 0)
+    return statistik
+
+
+# read the tables once and compute all statistics, keyed by the name they are written
+# under by write_corpus_statistics
+def corpus_statistics(
+    database_path: str, chunksize: int = CHUNKSIZE
+) -> dict[str, pd.DataFrame]:
+    with sqlite3.connect(database_path) as conn:
+        reden = read_reden(conn, chunksize)
+        kommentare = read_kommentare(conn, chunksize)
+        redner = read_redner(conn)
+        sitzungen = read_sitzungen(conn)
+
+    reden_statistik = reden_statistics(reden, kommentare, redner)
+    return {
+        "reden": reden_statistik,
+        "redner": redner_statistics(reden_statistik, redner),
+        "fraktionen": fraktion_statistics(reden_statistik),
+        "sitzungen": sitzung_statistics(reden_statistik, sitzungen),
+    }
+
+
+# one parquet file per statistic, e.g. statistics/redner.parquet
+def write_corpus_statistics(
+    statistics: dict[str, pd.DataFrame], output_directory_path: str
+) -> None:
+    os.makedirs(output_directory_path, exist_ok=True)
+    for name, frame in statistics.items():
+        frame.to_parquet(os.path.join(output_directory_path, f"{name}.parquet"))
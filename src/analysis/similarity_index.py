@@ -0,0 +1,283 @@
+import hashlib
+import re
+import sqlite3
+import zlib
+from collections.abc import Iterator
+from functools import partial
+
+import numpy as np
+
+from src.analysis.batch_update import read_hashes, update_stale
+from src.sqlite.setup_db import bump_generation
+
+WORD_PATTERN = re.compile(r"\w+")
+MAX_HASH = np.uint64(0xFFFFFFFF)
+# multiplier combining the word hashes of a shingle and the rows of a band
+FNV_PRIME = np.uint64(0x100000001B3)
+# shingles hashed at once, bounds the num_perm x shingles matrix of long reden
+SHINGLE_CHUNK = 4096
+
+
+# minhash signatures over the word shingles of a text and their lsh bands, the hash
+# functions are the multiply-add-shift family ((a * x + b) mod 2^64) >> 32 with random
+# odd a, drawn from the seed so signatures of different runs and processes match,
+# with `bands` bands of num_perm / bands rows two texts of jaccard similarity s share
+# at least one bucket with probability 1 - (1 - s^rows)^bands
+class MinHashLSH:
+    def __init__(
+        self, num_perm: int = 128, bands: int = 32, shingle_size: int = 5, seed: int = 1
+    ):
+        if num_perm % bands != 0:
+            raise ValueError(
+                f"{num_perm} permutations can't be split into {bands} bands"
+            )
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+
+        generator = np.random.default_rng(seed)
+        self.a = generator.integers(1, 2**63, size=num_perm, dtype=np.uint64) | 1
+        self.b = generator.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    # signatures computed with other parameters can't be compared, they are part of the
+    # text hash so a change of parameters recomputes the whole index
+    def parameters(self) -> str:
+        return f"{self.num_perm}:{self.bands}:{self.shingle_size}:{self.seed}"
+
+    def text_hash(self, text: str) -> str:
+        return hashlib.sha1(f"{self.parameters()}\0{text}".encode("utf-8")).hexdigest()
+
+    # one 64-bit hash per shingle of shingle_size consecutive lowercased words, texts
+    # shorter than a shingle are a single shingle
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        words = WORD_PATTERN.findall(text.lower())
+        word_hashes = np.fromiter(
+            (zlib.crc32(word.encode("utf-8")) for word in words),
+            dtype=np.uint64,
+            count=len(words),
+        )
+        size = min(self.shingle_size, len(words))
+        count = len(words) - size + 1
+        hashes = np.zeros(count if size > 0 else 0, dtype=np.uint64)
+        for offset in range(size):
+            hashes = hashes * FNV_PRIME + word_hashes[offset : offset + count]
+        return hashes
+
+    # the num_perm minimum hash values of the shingle hashes, all MAX_HASH for a text
+    # without words
+    def minhash(self, hashes: np.ndarray) -> np.ndarray:
+        signature = np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(hashes), SHINGLE_CHUNK):
+            chunk = hashes[start : start + SHINGLE_CHUNK]
+            values = (self.a[:, None] * chunk[None, :] + self.b[:, None]) >> np.uint64(
+                32
+            )
+            np.minimum(signature, values.min(axis=1), out=signature)
+        return signature.astype(np.uint32)
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.minhash(self.shingle_hashes(text))
+
+    # one bucket per band, hashed from the rows of the band and stored as signed 64-bit
+    # integers as sqlite expects them
+    def buckets(self, signature: np.ndarray) -> np.ndarray:
+        rows = signature.astype(np.uint64).reshape(self.bands, self.rows)
+        buckets = np.zeros(self.bands, dtype=np.uint64)
+        for row in range(self.rows):
+            buckets = (buckets ^ rows[:, row]) * FNV_PRIME
+        return buckets.view(np.int64)
+
+
+# the share of equal minimum hashes estimates the jaccard similarity of the shingles
+def estimate_similarity(signature: np.ndarray, other: np.ndarray) -> float:
+    return float(np.count_nonzero(signature == other)) / len(signature)
+
+
+def decode_signature(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.uint32)
+
+
+def sign_batch(lsh: MinHashLSH, texts: list[str]) -> list[tuple[bytes, list[int]]]:
+    results = []
+    for text in texts:
+        hashes = lsh.shingle_hashes(text)
+        signature = lsh.minhash(hashes)
+        # reden without words would all share every bucket
+        buckets = [] if len(hashes) == 0 else lsh.buckets(signature)
+        results.append((signature.tobytes(), [int(bucket) for bucket in buckets]))
+    return results
+
+
+def store_signatures(
+    cursor: sqlite3.Cursor,
+    stale: list[tuple[str, str, str]],
+    results: list[tuple[bytes, list[int]]],
+) -> None:
+    rede_ids = [(rede_id,) for rede_id, _, _ in stale]
+    cursor.executemany("DELETE FROM lsh_buckets WHERE rede_id = ?", rede_ids)
+    cursor.executemany(
+        """
+        INSERT INTO minhash_signaturen (rede_id, text_hash, signatur) VALUES (?, ?, ?)
+        ON CONFLICT (rede_id) DO UPDATE SET
+            text_hash = excluded.text_hash,
+            signatur = excluded.signatur
+    """,
+        [
+            (rede_id, current_hash, signature)
+            for (rede_id, current_hash, _), (signature, _) in zip(stale, results)
+        ],
+    )
+    cursor.executemany(
+        "INSERT INTO lsh_buckets (band, bucket, rede_id) VALUES (?, ?, ?)",
+        [
+            (band, bucket, rede_id)
+            for (rede_id, _, _), (_, buckets) in zip(stale, results)
+            for band, bucket in enumerate(buckets)
+        ],
+    )
+
+
+# the reden in batches of rede_id order, every batch is a query of its own so no read
+# is open while the signatures of the previous batch are written
+def iter_reden_batches(
+    cursor: sqlite3.Cursor, batch_size: int
+) -> Iterator[list[tuple[str, str]]]:
+    last_rede_id = ""
+    while batch := cursor.execute(
+        "SELECT rede_id, text FROM reden WHERE rede_id > ? ORDER BY rede_id LIMIT ?",
+        (last_rede_id, batch_size),
+    ).fetchall():
+        yield batch
+        last_rede_id = batch[-1][0]
+
+
+# bring the similarity index up to date with the reden table, only reden that are new
+# or whose text changed since they were signed are signed again, in batches across a
+# process pool, reden removed from the database are dropped from the index, returns
+# the number of signed reden
+def update_similarity_index(
+    database_path: str,
+    workers: int | None = None,
+    lsh: MinHashLSH | None = None,
+    batch_size: int = 256,
+) -> int:
+    if lsh is None:
+        lsh = MinHashLSH()
+
+    with sqlite3.connect(database_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "DELETE FROM lsh_buckets WHERE rede_id NOT IN (SELECT rede_id FROM reden)"
+        )
+        cursor.execute(
+            """DELETE FROM minhash_signaturen
+            WHERE rede_id NOT IN (SELECT rede_id FROM reden)"""
+        )
+
+        signed = update_stale(
+            iter_reden_batches(cursor, batch_size),
+            stored_hashes=partial(read_hashes, cursor, "minhash_signaturen", "rede_id"),
+            text_hash=lsh.text_hash,
+            process_batch=partial(sign_batch, lsh),
+            store=partial(store_signatures, cursor),
+            workers=workers,
+        )
+
+        bump_generation(cursor)
+        conn.commit()
+
+    return signed
+
+
+# reden with an estimated jaccard similarity of at least `threshold` to the given one,
+# most similar first, only the reden sharing a bucket with it are compared
+def similar_reden(
+    database_path: str, rede_id: str, threshold: float = 0.5, limit: int = 20
+) -> list[tuple[str, float]]:
+    with sqlite3.connect(database_path) as conn:
+        row = conn.execute(
+            "SELECT signatur FROM minhash_signaturen WHERE rede_id = ?", (rede_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"rede {rede_id} isn't in the similarity index")
+        signature = decode_signature(row[0])
+
+        candidates = conn.execute(
+            """
+            SELECT minhash_signaturen.rede_id, minhash_signaturen.signatur
+            FROM minhash_signaturen
+            WHERE minhash_signaturen.rede_id IN (
+                SELECT DISTINCT kandidaten.rede_id
+                FROM lsh_buckets AS eigene
+                JOIN lsh_buckets AS kandidaten
+                    ON kandidaten.band = eigene.band
+                    AND kandidaten.bucket = eigene.bucket
+                WHERE eigene.rede_id = ? AND kandidaten.rede_id != eigene.rede_id
+            )
+        """,
+            (rede_id,),
+        ).fetchall()
+
+    similar = []
+    for candidate_id, blob in candidates:
+        similarity = estimate_similarity(signature, decode_signature(blob))
+        if similarity >= threshold:
+            similar.append((candidate_id, similarity))
+    similar.sort(key=lambda item: (-item[1], item[0]))
+    return similar[:limit]
+
+
+def find(parents: dict, rede_id: str) -> str:
+    while parents[rede_id] != rede_id:
+        parents[rede_id] = parents[parents[rede_id]]
+        rede_id = parents[rede_id]
+    return rede_id
+
+
+# groups of near-duplicate reden, largest first, the members of every bucket shared by
+# more than one rede are compared against the first member of the bucket, pairs above
+# the threshold are joined with union-find, so a cluster may also contain reden only
+# transitively similar to each other, the work grows with the number of shared
+# buckets, not with the number of pairs of reden
+def duplicate_clusters(
+    database_path: str, threshold: float = 0.8, min_size: int = 2
+) -> list[list[str]]:
+    with sqlite3.connect(database_path) as conn:
+        shared_buckets = conn.execute(
+            """
+            SELECT group_concat(rede_id, char(31))
+            FROM lsh_buckets
+            GROUP BY band, bucket
+            HAVING COUNT(*) > 1
+        """
+        ).fetchall()
+        members = {
+            rede_id
+            for (bucket_members,) in shared_buckets
+            for rede_id in bucket_members.split("\x1f")
+        }
+        signatures = dict()
+        for rede_id, blob in conn.execute(
+            "SELECT rede_id, signatur FROM minhash_signaturen"
+        ):
+            if rede_id in members:
+                signatures[rede_id] = decode_signature(blob)
+
+    parents = {rede_id: rede_id for rede_id in signatures}
+    for (bucket_members,) in shared_buckets:
+        first, *others = sorted(bucket_members.split("\x1f"))
+        for other in others:
+            if find(parents, first) == find(parents, other):
+                continue
+            if estimate_similarity(signatures[first], signatures[other]) >= threshold:
+                parents[find(parents, other)] = find(parents, first)
+
+    clusters = dict()
+    for rede_id in parents:
+        clusters.setdefault(find(parents, rede_id), []).append(rede_id)
+    return sorted(
+        (sorted(cluster) for cluster in clusters.values() if len(cluster) >= min_size),
+        key=lambda cluster: (-len(cluster), cluster[0]),
+    )
@@ -0,0 +1,185 @@
+import sqlite3
+from collections import Counter
+from collections.abc import Iterable
+
+from nltk.corpus import stopwords as nltk_stopwords
+
+from src.analysis.token_cache import TokenCache, iter_reden_from_database
+from src.sqlite.setup_db import ISO_DATUM, bump_generation
+
+
+def german_stopwords() -> set[str]:
+    return set(nltk_stopwords.words("german"))
+
+
+# terms are lowercased, tokens without any letter or digit (punctuation) are skipped
+def normalize_term(token: str) -> str | None:
+    if not any(character.isalnum() for character in token):
+        return None
+    return token.lower()
+
+
+# bring the index up to date with the reden table, only reden that are new or whose
+# text changed since they were indexed are tokenized (through the token cache) and
+# counted, reden removed from the database are dropped from the index
+def update_term_index(
+    database_path: str, cache_path: str, workers: int | None = None
+) -> int:
+    cache = TokenCache(cache_path)
+    try:
+        cache.update(iter_reden_from_database(database_path), workers=workers)
+    finally:
+        cache.close()
+
+    with sqlite3.connect(database_path) as conn:
+        conn.execute("ATTACH DATABASE ? AS cache", (cache_path,))
+        cursor = conn.cursor()
+
+        stale_reden = cursor.execute(
+            """
+            SELECT token_streams.rede_id, token_streams.text_hash
+            FROM cache.token_streams AS token_streams
+            JOIN reden ON reden.rede_id = token_streams.rede_id
+            LEFT JOIN termindex_reden
+                ON termindex_reden.rede_id = token_streams.rede_id
+            WHERE termindex_reden.text_hash IS NOT token_streams.text_hash
+        """
+        ).fetchall()
+        conn.execute("DETACH DATABASE cache")
+
+        cursor.execute(
+            "DELETE FROM termfrequenzen WHERE rede_id NOT IN (SELECT rede_id FROM reden)"
+        )
+        cursor.execute(
+            "DELETE FROM termindex_reden WHERE rede_id NOT IN (SELECT rede_id FROM reden)"
+        )
+        if len(stale_reden) == 0:
+            return 0
+
+        term_ids = dict(cursor.execute("SELECT term, term_id FROM terme"))
+        next_term_id = max(term_ids.values(), default=0) + 1
+
+        cache = TokenCache(cache_path)
+        try:
+            # map the ids of the cache vocabulary onto term ids once per token
+            cache_term_ids = dict()
+            text_hashes = dict(stale_reden)
+            for rede_id, token_ids in cache.iter_token_ids(list(text_hashes)):
+                counts = Counter()
+                for token_id in token_ids:
+                    if token_id not in cache_term_ids:
+                        term = normalize_term(cache.vocabulary[token_id])
+                        if term is not None and term not in term_ids:
+                            term_ids[term] = next_term_id
+                            cursor.execute(
+                                "INSERT INTO terme (term_id, term) VALUES (?, ?)",
+                                (next_term_id, term),
+                            )
+                            next_term_id += 1
+                        cache_term_ids[token_id] = term_ids.get(term)
+                    term_id = cache_term_ids[token_id]
+                    if term_id is not None:
+                        counts[term_id] += 1
+
+                cursor.execute(
+                    "DELETE FROM termfrequenzen WHERE rede_id = ?", (rede_id,)
+                )
+                cursor.executemany(
+                    """
+                    INSERT INTO termfrequenzen (rede_id, term_id, anzahl)
+                    VALUES (?, ?, ?)
+                """,
+                    [(rede_id, term_id, anzahl) for term_id, anzahl in counts.items()],
+                )
+                cursor.execute(
+                    """
+                    INSERT INTO termindex_reden (rede_id, text_hash) VALUES (?, ?)
+                    ON CONFLICT (rede_id) DO UPDATE SET text_hash = excluded.text_hash
+                """,
+                    (rede_id, text_hashes[rede_id]),
+                )
+        finally:
+            cache.close()
+
+        bump_generation(cursor)
+        conn.commit()
+
+    return len(stale_reden)
+
+
+# the k most frequent terms, optionally restricted to a speaker, a party, a sitzung
+# and a date range (iso dates, inclusive), stopwords default to the german nltk list,
+# pass an empty set to keep them
+def top_terms(
+    database_path: str,
+    k: int = 20,
+    redner_id: int | None = None,
+    fraktion: str | None = None,
+    sitzungs_id: int | None = None,
+    datum_von: str | None = None,
+    datum_bis: str | None = None,
+    stopwords: Iterable[str] | None = None,
+) -> list[tuple[str, int]]:
+    if stopwords is None:
+        stopwords = german_stopwords()
+    stopwords = sorted(stopwords)
+
+    joins = []
+    conditions = []
+    params = []
+    if any(
+        value is not None
+        for value in (redner_id, fraktion, sitzungs_id, datum_von, datum_bis)
+    ):
+        joins.append("JOIN reden ON reden.rede_id = termfrequenzen.rede_id")
+    if fraktion is not None:
+        joins.append("JOIN redner ON redner.redner_id = reden.redner_id")
+    if any(value is not None for value in (sitzungs_id, datum_von, datum_bis)):
+        joins.append(
+            """JOIN tagesordnungspunkte ON tagesordnungspunkte.tagesordnungspunkt_id
+            = reden.tagesordnungspunkt_id"""
+        )
+        joins.append(
+            "JOIN sitzungen ON sitzungen.sitzungs_id = tagesordnungspunkte.sitzungs_id"
+        )
+
+    for condition, value in (
+        ("reden.redner_id = ?", redner_id),
+        (
+            "redner.fraktion_id = (SELECT fraktion_id FROM fraktionen WHERE name = ?)",
+            fraktion,
+        ),
+        ("sitzungen.sitzungs_id = ?", sitzungs_id),
+        (f"{ISO_DATUM} >= ?", datum_von),
+        (f"{ISO_DATUM} <= ?", datum_bis),
+    ):
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    if len(stopwords) > 0:
+        conditions.append(
+            f"""termfrequenzen.term_id NOT IN (
+                SELECT term_id FROM terme WHERE term IN ({", ".join("?" * len(stopwords))})
+            )"""
+        )
+        params.extend(stopwords)
+
+    where = f"WHERE {' AND '.join(conditions)}" if len(conditions) > 0 else ""
+    with sqlite3.connect(database_path) as conn:
+        return conn.execute(
+            f"""
+            SELECT terme.term, top.anzahl
+            FROM (
+                SELECT termfrequenzen.term_id, SUM(termfrequenzen.anzahl) AS anzahl
+                FROM termfrequenzen
+                {" ".join(joins)}
+                {where}
+                GROUP BY termfrequenzen.term_id
+                ORDER BY anzahl DESC
+                LIMIT ?
+            ) AS top
+            JOIN terme ON terme.term_id = top.term_id
+            ORDER BY top.anzahl DESC
+        """,
+            [*params, k],
+        ).fetchall()
@@ -0,0 +1,145 @@
+import hashlib
+import sqlite3
+from array import array
+from collections.abc import Iterable, Iterator
+from functools import partial
+
+from nltk.tokenize import sent_tokenize, word_tokenize
+
+from src.analysis.batch_update import batched, read_hashes, update_stale
+
+sql_statements = [
+    """CREATE TABLE IF NOT EXISTS vokabular(
+            token_id INTEGER PRIMARY KEY,
+            token TEXT NOT NULL UNIQUE
+        );""",
+    """CREATE TABLE IF NOT EXISTS token_streams(
+            rede_id TEXT PRIMARY KEY NOT NULL,
+            text_hash TEXT NOT NULL,
+            tokens BLOB NOT NULL
+        );""",
+]
+
+
+# paragraph by paragraph and sentence by sentence like DataAnalyzer.tokenize_words,
+# but with the punkt model of `language` instead of nltk's english default, so the
+# tokens of abbreviations like "Abg." or "z. B." can differ from tokenize_words
+def tokenize_text(text: str, language: str = "german") -> list[str]:
+    tokens = []
+    for paragraph in text.split("\n"):
+        for sentence in sent_tokenize(paragraph, language=language):
+            tokens.extend(word_tokenize(sentence, language=language))
+    return tokens
+
+
+def tokenize_batch(texts: list[str], language: str) -> list[list[str]]:
+    return [tokenize_text(text, language) for text in texts]
+
+
+def text_hash(text: str, language: str) -> str:
+    return hashlib.sha1(f"{language}\0{text}".encode("utf-8")).hexdigest()
+
+
+def iter_reden_from_database(database_path: str) -> Iterator[tuple[str, str]]:
+    with sqlite3.connect(database_path) as conn:
+        yield from conn.execute("SELECT rede_id, text FROM reden ORDER BY rede_id")
+
+
+# token streams per rede stored as arrays of integer ids into a shared vocabulary,
+# a rede is only tokenized again when its text (or the tokenizer language) changed
+class TokenCache:
+    def __init__(self, cache_path: str, language: str = "german"):
+        self.language = language
+        self.conn = sqlite3.connect(cache_path)
+        for statement in sql_statements:
+            self.conn.execute(statement)
+        self.conn.commit()
+
+        self.vocabulary = [None]
+        self.token_ids = dict()
+        for token_id, token in self.conn.execute(
+            "SELECT token_id, token FROM vokabular ORDER BY token_id"
+        ):
+            self.vocabulary.append(token)
+            self.token_ids[token] = token_id
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def encode(self, tokens: list[str]) -> array:
+        token_ids = array("I")
+        for token in tokens:
+            token_id = self.token_ids.get(token)
+            if token_id is None:
+                token_id = len(self.vocabulary)
+                self.vocabulary.append(token)
+                self.token_ids[token] = token_id
+                self.conn.execute(
+                    "INSERT INTO vokabular (token_id, token) VALUES (?, ?)",
+                    (token_id, token),
+                )
+            token_ids.append(token_id)
+        return token_ids
+
+    def store(self, stale: list[tuple[str, str, str]], tokens: list[list[str]]) -> None:
+        self.conn.executemany(
+            """
+            INSERT INTO token_streams (rede_id, text_hash, tokens) VALUES (?, ?, ?)
+            ON CONFLICT (rede_id) DO UPDATE SET
+                text_hash = excluded.text_hash,
+                tokens = excluded.tokens
+        """,
+            [
+                (rede_id, current_hash, self.encode(rede_tokens).tobytes())
+                for (rede_id, current_hash, _), rede_tokens in zip(stale, tokens)
+            ],
+        )
+        self.conn.commit()
+
+    # tokenize every new or changed rede in batches across a process pool, returns the
+    # number of tokenized reden
+    def update(
+        self,
+        reden: Iterable[tuple[str, str]],
+        workers: int | None = None,
+        batch_size: int = 256,
+    ) -> int:
+        return update_stale(
+            batched(reden, batch_size),
+            stored_hashes=partial(read_hashes, self.conn, "token_streams", "rede_id"),
+            text_hash=partial(text_hash, language=self.language),
+            process_batch=partial(tokenize_batch, language=self.language),
+            store=self.store,
+            workers=workers,
+        )
+
+    # stream the cached token ids rede by rede without materializing the corpus
+    def iter_token_ids(
+        self, rede_ids: list[str] | None = None
+    ) -> Iterator[tuple[str, array]]:
+        if rede_ids is None:
+            rows = self.conn.execute(
+                "SELECT rede_id, tokens FROM token_streams ORDER BY rede_id"
+            )
+        else:
+            rows = (
+                self.conn.execute(
+                    "SELECT rede_id, tokens FROM token_streams WHERE rede_id = ?",
+                    (rede_id,),
+                ).fetchone()
+                for rede_id in rede_ids
+            )
+        for row in rows:
+            if row is None:
+                continue
+            rede_id, blob = row
+            token_ids = array("I")
+            token_ids.frombytes(blob)
+            yield rede_id, token_ids
+
+    def iter_tokens(
+        self, rede_ids: list[str] | None = None
+    ) -> Iterator[tuple[str, list[str]]]:
+        vocabulary = self.vocabulary
+        for rede_id, token_ids in self.iter_token_ids(rede_ids):
+            yield rede_id, [vocabulary[token_id] for token_id in token_ids]
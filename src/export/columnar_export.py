@@ -0,0 +1,222 @@
+import os
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# typed schemas of the flat tables, speaker and party columns are dictionary encoded
+# since they repeat across millions of rows
+REDEN_SCHEMA = pa.schema(
+    [
+        ("rede_id", pa.string()),
+        ("sitzungs_id", pa.int32()),
+        ("tagesordnungspunkt", pa.dictionary(pa.int32(), pa.string())),
+        ("redner_id", pa.int64()),
+        ("redner", pa.dictionary(pa.int32(), pa.string())),
+        ("fraktion_id", pa.int16()),
+        ("fraktion", pa.dictionary(pa.int16(), pa.string())),
+        ("rollen_id", pa.int16()),
+        ("absaetze", pa.int32()),
+        ("text", pa.large_string()),
+    ]
+)
+KOMMENTARE_SCHEMA = pa.schema(
+    [
+        ("rede_id", pa.string()),
+        ("sitzungs_id", pa.int32()),
+        ("kommentar_index", pa.int32()),
+        ("art", pa.dictionary(pa.int8(), pa.string())),
+        ("kommentator", pa.dictionary(pa.int32(), pa.string())),
+        ("fraktion", pa.dictionary(pa.int16(), pa.string())),
+        ("text", pa.string()),
+    ]
+)
+REDNER_SCHEMA = pa.schema(
+    [
+        ("redner_id", pa.int64()),
+        ("titel", pa.dictionary(pa.int8(), pa.string())),
+        ("vorname", pa.string()),
+        ("nachname", pa.string()),
+        ("fraktion_id", pa.int16()),
+        ("fraktion", pa.dictionary(pa.int16(), pa.string())),
+    ]
+)
+FRAKTIONEN_SCHEMA = pa.schema([("fraktion_id", pa.int16()), ("name", pa.string())])
+SITZUNGEN_SCHEMA = pa.schema(
+    [
+        ("sitzungs_id", pa.int32()),
+        ("wahlperiode", pa.int16()),
+        ("sitzung_nr", pa.int32()),
+        ("datum", pa.date32()),
+        ("start", pa.string()),
+        ("ende", pa.string()),
+    ]
+)
+
+
+def write_partition(
+    rows: dict[str, list], schema: pa.Schema, directory_path: str
+) -> None:
+    os.makedirs(directory_path, exist_ok=True)
+    table = pa.Table.from_pydict(rows, schema=schema)
+    pq.write_table(
+        table, os.path.join(directory_path, "part-0.parquet"), compression="zstd"
+    )
+
+
+# add the rows written by earlier runs to a table, rows with a key that is in the table
+# are replaced by the new version
+def merge_existing(table: pa.Table, directory_path: str, key_column: str) -> pa.Table:
+    if not os.path.isdir(directory_path):
+        return table
+    existing = pq.read_table(directory_path, schema=table.schema, partitioning="hive")
+    existing = existing.filter(
+        pc.invert(pc.is_in(existing[key_column], value_set=table[key_column]))
+    )
+    return pa.concat_tables([existing, table]).combine_chunks()
+
+
+# pass the sitzungen yielded by PlenarprotokollXMLParser.iter_sitzungen through while
+# writing them as parquet files partitioned like
+# reden/wahlperiode=20/sitzung=1/part-0.parquet, redner, fraktionen and sitzungen are
+# written once the stream is exhausted
+def export_sitzungen(
+    sitzungen: Iterable[dict], output_directory_path: str
+) -> Iterator[dict]:
+    registry = None
+    sitzungen_rows = {name: [] for name in SITZUNGEN_SCHEMA.names}
+
+    for sitzung in sitzungen:
+        # the registry of the parser knows every speaker referenced so far, including
+        # the ones read from the database that aren't new to any sitzung
+        registry = sitzung["registry"]
+        metadaten = sitzung["sitzung"]["metadaten"]
+        wahlperiode = int(metadaten["wahlperiode"])
+        sitzung_nr = int(metadaten["sitzung_nr"])
+        sitzungs_id = int(sitzung["sitzungs_id"])
+
+        sitzungen_rows["sitzungs_id"].append(sitzungs_id)
+        sitzungen_rows["wahlperiode"].append(wahlperiode)
+        sitzungen_rows["sitzung_nr"].append(sitzung_nr)
+        sitzungen_rows["datum"].append(
+            datetime.strptime(metadaten["datum"], "%d.%m.%Y").date()
+        )
+        sitzungen_rows["start"].append(metadaten["sitzungsbeginn"])
+        sitzungen_rows["ende"].append(metadaten["sitzungsende"])
+
+        reden_rows = {name: [] for name in REDEN_SCHEMA.names}
+        kommentare_rows = {name: [] for name in KOMMENTARE_SCHEMA.names}
+        for tagesordnungspunkt, reden in sitzung["sitzung"]["inhalt"].items():
+            for rede_id, rede in reden.items():
+                redner_id = rede["reference"]["redner"]
+                redner = registry.redner.get(redner_id)
+                if redner is None:
+                    raise ValueError(
+                        f"rede {rede_id} references the unknown speaker {redner_id}"
+                    )
+                rolle = rede["reference"].get("rolle")
+
+                reden_rows["rede_id"].append(rede_id)
+                reden_rows["sitzungs_id"].append(sitzungs_id)
+                reden_rows["tagesordnungspunkt"].append(tagesordnungspunkt)
+                reden_rows["redner_id"].append(int(redner_id))
+                reden_rows["redner"].append(f"{redner.vorname} {redner.nachname}")
+                reden_rows["fraktion_id"].append(
+                    registry.fraktion_ids.get(redner.fraktion)
+                )
+                reden_rows["fraktion"].append(redner.fraktion)
+                reden_rows["rollen_id"].append(int(rolle) if rolle else None)
+                reden_rows["absaetze"].append(len(rede["text"]))
+                reden_rows["text"].append("\n".join(rede["text"]))
+
+                for kommentar_index, kommentar in rede.get("kommentare", {}).items():
+                    kommentare_rows["rede_id"].append(rede_id)
+                    kommentare_rows["sitzungs_id"].append(sitzungs_id)
+                    kommentare_rows["kommentar_index"].append(int(kommentar_index))
+                    kommentare_rows["art"].append(kommentar.get("art", "zwischenruf"))
+                    kommentare_rows["kommentator"].append(kommentar["commentator"])
+                    kommentare_rows["fraktion"].append(kommentar["fraktion"])
+                    kommentare_rows["text"].append(kommentar["text"])
+
+        partition = os.path.join(f"wahlperiode={wahlperiode}", f"sitzung={sitzung_nr}")
+        write_partition(
+            reden_rows,
+            REDEN_SCHEMA,
+            os.path.join(output_directory_path, "reden", partition),
+        )
+        write_partition(
+            kommentare_rows,
+            KOMMENTARE_SCHEMA,
+            os.path.join(output_directory_path, "kommentare", partition),
+        )
+
+        yield sitzung
+
+    # all speakers of the registry, so the table is complete even if this run only
+    # parsed some of the protocols, speakers exported by earlier runs with a parser
+    # that didn't know them are kept
+    if registry is not None:
+        redner_rows = {name: [] for name in REDNER_SCHEMA.names}
+        for redner_id, redner in registry.redner.items():
+            redner_rows["redner_id"].append(int(redner_id))
+            redner_rows["titel"].append(redner.titel)
+            redner_rows["vorname"].append(redner.vorname)
+            redner_rows["nachname"].append(redner.nachname)
+            redner_rows["fraktion_id"].append(
+                registry.fraktion_ids.get(redner.fraktion)
+            )
+            redner_rows["fraktion"].append(redner.fraktion)
+        redner_path = os.path.join(output_directory_path, "redner")
+        redner_table = merge_existing(
+            pa.Table.from_pydict(redner_rows, schema=REDNER_SCHEMA),
+            redner_path,
+            "redner_id",
+        )
+        write_partition(redner_table.to_pydict(), REDNER_SCHEMA, redner_path)
+
+        # the ids of the registry are the ones stored in the database, so the table is
+        # rewritten as a whole
+        write_partition(
+            {
+                "fraktion_id": list(registry.fraktionen),
+                "name": list(registry.fraktionen.values()),
+            },
+            FRAKTIONEN_SCHEMA,
+            os.path.join(output_directory_path, "fraktionen"),
+        )
+
+    # the partitions of the wahlperioden are rewritten as a whole, so the sitzungen of
+    # earlier runs are merged in first
+    sitzungen_path = os.path.join(output_directory_path, "sitzungen")
+    sitzungen_table = merge_existing(
+        pa.Table.from_pydict(sitzungen_rows, schema=SITZUNGEN_SCHEMA),
+        sitzungen_path,
+        "sitzungs_id",
+    )
+    pq.write_to_dataset(
+        sitzungen_table,
+        sitzungen_path,
+        partition_cols=["wahlperiode"],
+        existing_data_behavior="delete_matching",
+    )
+
+
+# read one of the exported tables, only the requested columns and partitions are
+# scanned, e.g. read_table(path, "reden", ["redner", "fraktion"], wahlperiode=20)
+def read_table(
+    output_directory_path: str,
+    table_name: str,
+    columns: list[str] | None = None,
+    wahlperiode: int | None = None,
+) -> pa.Table:
+    filters = None
+    if wahlperiode is not None:
+        filters = [("wahlperiode", "=", wahlperiode)]
+    return pq.read_table(
+        os.path.join(output_directory_path, table_name),
+        columns=columns,
+        filters=filters,
+        memory_map=True,
+    )
@@ -0,0 +1,247 @@
+import gzip
+import hashlib
+import io
+import mmap
+import os
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+import zlib
+from pathlib import Path
+from typing import BinaryIO
+
+# the offsets of the members are stored next to the archive in a small sqlite database
+INDEX_SUFFIX = ".index"
+
+sql_statements = [
+    """CREATE TABLE IF NOT EXISTS protokolle(
+            wahlperiode INTEGER NOT NULL,
+            sitzung_nr INTEGER NOT NULL,
+            name TEXT NOT NULL UNIQUE,
+            position INTEGER NOT NULL,
+            laenge INTEGER NOT NULL,
+            groesse INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            gespeichert REAL NOT NULL,
+            PRIMARY KEY (wahlperiode, sitzung_nr)
+        );""",
+]
+
+MEMBER_COLUMNS = (
+    "name, wahlperiode, sitzung_nr, position, laenge, groesse, hash, gespeichert"
+)
+
+# memory maps of the archives read by this process, reused across members and
+# replaced once the archive grew beyond the mapped length
+mapped_archives = dict()
+mapped_archives_lock = threading.Lock()
+
+
+# a single protocol in an archive, small enough to be sent to a worker process which
+# then reads it from its own memory map of the archive
+class ArchiveMember:
+    __slots__ = (
+        "archive_path",
+        "name",
+        "wahlperiode",
+        "sitzung_nr",
+        "position",
+        "laenge",
+        "groesse",
+        "hash",
+        "gespeichert",
+    )
+
+    def __init__(self, archive_path: str, *fields):
+        self.archive_path = archive_path
+        for field, value in zip(self.__slots__[1:], fields):
+            setattr(self, field, value)
+
+    # used as the path of the protocol, e.g. in the manifest of the incremental load
+    def __str__(self) -> str:
+        return f"{self.archive_path}#{self.name}"
+
+    def read(self) -> bytes:
+        return zlib.decompress(
+            archive_map(self.archive_path, self.position + self.laenge)[
+                self.position : self.position + self.laenge
+            ],
+            wbits=31,
+        )
+
+    def open(self) -> BinaryIO:
+        return io.BytesIO(self.read())
+
+
+def archive_map(archive_path: str, length: int) -> mmap.mmap:
+    with mapped_archives_lock:
+        mapped = mapped_archives.get(archive_path)
+        if mapped is None or len(mapped) < length:
+            with open(archive_path, "rb") as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            mapped_archives[archive_path] = mapped
+        return mapped
+
+
+def is_archive(path: str | Path) -> bool:
+    return os.path.isfile(f"{path}{INDEX_SUFFIX}")
+
+
+# the protocols to parse, either every xml file below a directory or every member of
+# an archive, in the order of their wahlperiode and sitzung-nr
+def list_protokolle(input_path: str | Path) -> list[Path | ArchiveMember]:
+    if is_archive(input_path):
+        archive = PlenarprotokollArchive(str(input_path))
+        try:
+            return archive.members()
+        finally:
+            archive.close()
+    return sorted(Path(input_path).rglob("*.xml"))
+
+
+def open_protokoll(source: str | Path | ArchiveMember) -> BinaryIO:
+    if isinstance(source, ArchiveMember):
+        return source.open()
+    return open(source, "rb")
+
+
+def protokoll_size(source: str | Path | ArchiveMember) -> int:
+    if isinstance(source, ArchiveMember):
+        return source.groesse
+    return os.path.getsize(source)
+
+
+# wahlperiode and sitzung-nr from the attributes of the root element
+def read_sitzung_key(content: bytes) -> tuple[int, int]:
+    for _, element in ET.iterparse(io.BytesIO(content), events=("start",)):
+        return int(element.attrib["wahlperiode"]), int(element.attrib["sitzung-nr"])
+    raise ValueError("protocol without root element")
+
+
+# all protocols in one append-only file of independently gzip-compressed members, the
+# index maps wahlperiode and sitzung-nr to the position of the member, so a single
+# protocol is read without walking a directory or decompressing anything else, a
+# replaced protocol leaves its old member behind until compact is called
+class PlenarprotokollArchive:
+    def __init__(self, archive_path: str, compresslevel: int = 6):
+        self.archive_path = archive_path
+        self.compresslevel = compresslevel
+        self.index = sqlite3.connect(
+            archive_path + INDEX_SUFFIX, check_same_thread=False
+        )
+        for statement in sql_statements:
+            self.index.execute(statement)
+        self.index.commit()
+        # the scraper adds protocols from several threads
+        self.lock = threading.Lock()
+
+    def member(self, row: tuple) -> ArchiveMember:
+        return ArchiveMember(self.archive_path, *row)
+
+    def get(self, wahlperiode: int, sitzung_nr: int) -> ArchiveMember | None:
+        with self.lock:
+            row = self.index.execute(
+                f"""SELECT {MEMBER_COLUMNS} FROM protokolle
+                WHERE wahlperiode = ? AND sitzung_nr = ?""",
+                (wahlperiode, sitzung_nr),
+            ).fetchone()
+        return None if row is None else self.member(row)
+
+    # look up a protocol by the name of its file, e.g. "20137.xml"
+    def find(self, name: str) -> ArchiveMember | None:
+        with self.lock:
+            row = self.index.execute(
+                f"SELECT {MEMBER_COLUMNS} FROM protokolle WHERE name = ?", (name,)
+            ).fetchone()
+        return None if row is None else self.member(row)
+
+    def members(self) -> list[ArchiveMember]:
+        with self.lock:
+            rows = self.index.execute(
+                f"""SELECT {MEMBER_COLUMNS} FROM protokolle
+                ORDER BY wahlperiode, sitzung_nr"""
+            ).fetchall()
+        return [self.member(row) for row in rows]
+
+    def read(self, wahlperiode: int, sitzung_nr: int) -> bytes:
+        member = self.get(wahlperiode, sitzung_nr)
+        if member is None:
+            raise KeyError(f"no protocol {wahlperiode}/{sitzung_nr} in the archive")
+        return member.read()
+
+    # add or replace a protocol, unchanged content isn't written again, the member is
+    # appended and synced before the index points to it, so an interrupted write only
+    # leaves unreferenced bytes at the end of the archive
+    def add(self, name: str, content: bytes) -> ArchiveMember:
+        wahlperiode, sitzung_nr = read_sitzung_key(content)
+        content_hash = hashlib.sha256(content).hexdigest()
+        existing = self.get(wahlperiode, sitzung_nr)
+        if existing is not None and existing.hash == content_hash:
+            return existing
+
+        compressed = gzip.compress(content, self.compresslevel, mtime=0)
+        with self.lock:
+            with open(self.archive_path, "ab") as file:
+                position = file.seek(0, os.SEEK_END)
+                file.write(compressed)
+                file.flush()
+                os.fsync(file.fileno())
+            row = (
+                name,
+                wahlperiode,
+                sitzung_nr,
+                position,
+                len(compressed),
+                len(content),
+                content_hash,
+                time.time(),
+            )
+            self.index.execute(
+                f"INSERT OR REPLACE INTO protokolle ({MEMBER_COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self.index.commit()
+        return self.member(row)
+
+    # rewrite the archive with only the current members, dropping replaced ones
+    def compact(self) -> None:
+        with self.lock:
+            rows = self.index.execute(
+                f"""SELECT {MEMBER_COLUMNS} FROM protokolle
+                ORDER BY wahlperiode, sitzung_nr"""
+            ).fetchall()
+            compact_path = self.archive_path + ".compact"
+            positions = []
+            with open(self.archive_path, "rb") as source, open(
+                compact_path, "wb"
+            ) as target:
+                for name, _, _, position, laenge, _, _, _ in rows:
+                    source.seek(position)
+                    positions.append((target.tell(), name))
+                    target.write(source.read(laenge))
+                target.flush()
+                os.fsync(target.fileno())
+            os.replace(compact_path, self.archive_path)
+            self.index.executemany(
+                "UPDATE protokolle SET position = ? WHERE name = ?", positions
+            )
+            self.index.commit()
+        with mapped_archives_lock:
+            mapped_archives.pop(self.archive_path, None)
+
+    def close(self) -> None:
+        self.index.close()
+
+
+# copy a directory of xml files into an archive, e.g. the output of earlier scraper runs
+def pack_directory(xml_directory_path: str, archive_path: str) -> int:
+    archive = PlenarprotokollArchive(archive_path)
+    try:
+        pathlist = sorted(Path(xml_directory_path).rglob("*.xml"))
+        for path in pathlist:
+            archive.add(path.name, path.read_bytes())
+    finally:
+        archive.close()
+    return len(pathlist)
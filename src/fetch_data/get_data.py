@@ -1,44 +1,252 @@
+import json
 import os
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from http import HTTPStatus
+from urllib.parse import urljoin
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 
+from src.fetch_data.archive import PlenarprotokollArchive
+from src.instrumentation.run_report import run_report
 
-def scrape_data(output_directory_path: str) -> None:
+FILTERLIST_URL = (
+    "https://www.bundestag.de/ajax/filterlist/de/services/opendata/866354-866354"
+)
 
-    url = "https://www.bundestag.de/ajax/filterlist/de/services/opendata/866354-866354"
+# name of the file in the output directory keeping the offset and the cache headers
+STATE_FILE_NAME = ".scrape_state.json"
+
+# responses worth another attempt, rate limiting and temporary server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# politeness limit shared by all download threads, allows a burst of `capacity`
+# requests and refills at `rate` requests per second
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# one pooled session for all requests, retries are left to polite_get so that every
+# attempt goes through the token bucket
+def create_session(concurrency: int) -> requests.Session:
+    adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# seconds to wait as asked for by a Retry-After header, given in seconds or as a date
+def retry_after(response: requests.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+# GET a url, every attempt takes a token from the bucket, failed requests and rate
+# limiting responses are retried with exponential backoff, honouring a Retry-After
+# header, the response of the last attempt is returned as it is
+def polite_get(
+    session: requests.Session,
+    bucket: TokenBucket,
+    url: str,
+    retries: int = 5,
+    backoff_factor: float = 1,
+    **kwargs,
+) -> requests.Response:
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        try:
+            response = session.get(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+            wait = None
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            wait = retry_after(response)
+        run_report.count("fetch.retries")
+        time.sleep(wait if wait is not None else backoff_factor * 2**attempt)
+
+
+def load_state(output_directory_path: str) -> dict:
+    state_path = os.path.join(output_directory_path, STATE_FILE_NAME)
+    if not os.path.exists(state_path):
+        return {"offset": 0, "files": {}}
+    with open(state_path, "rt", encoding="utf-8") as file:
+        return json.load(file)
+
+
+# write to a temporary file first so an interrupted run never leaves a broken state
+def save_state(output_directory_path: str, state: dict) -> None:
+    state_path = os.path.join(output_directory_path, STATE_FILE_NAME)
+    with open(state_path + ".tmp", "wt", encoding="utf-8") as file:
+        json.dump(state, file, indent=4)
+    os.replace(state_path + ".tmp", state_path)
+
+
+# download a single protocol, returns the cache headers to store for it or None if it
+# was skipped, existing files are only requested again when `refresh` is set and then
+# with If-None-Match/If-Modified-Since so unchanged files aren't transferred, with an
+# archive the protocol is added to it instead of being written to its own file
+def download_xml(
+    session: requests.Session,
+    bucket: TokenBucket,
+    href: str,
+    output_directory_path: str,
+    cache_headers: dict,
+    refresh: bool,
+    timeout: float,
+    archive: PlenarprotokollArchive | None = None,
+) -> dict | None:
+    xml_file_name = href.split("/")[-1]
+    xml_file_path = os.path.join(output_directory_path, xml_file_name)
+
+    if archive is not None:
+        exists = archive.find(xml_file_name) is not None
+    else:
+        exists = os.path.exists(xml_file_path)
+
+    headers = dict()
+    if exists:
+        if not refresh:
+            run_report.count("fetch.skipped")
+            return None
+        if cache_headers.get("etag"):
+            headers["If-None-Match"] = cache_headers["etag"]
+        if cache_headers.get("last_modified"):
+            headers["If-Modified-Since"] = cache_headers["last_modified"]
+
+    with run_report.stage("fetch.download"):
+        xml_response = polite_get(
+            session, bucket, href, headers=headers, timeout=timeout
+        )
+    if xml_response.status_code == HTTPStatus.NOT_MODIFIED:
+        run_report.count("fetch.not_modified")
+        return None
+    xml_response.raise_for_status()
+    run_report.count("fetch.downloaded")
+    run_report.count("fetch.bytes", len(xml_response.content))
+
+    if archive is not None:
+        archive.add(xml_file_name, xml_response.content)
+    else:
+        # write to a temporary file first so an interrupted download isn't taken as complete
+        with open(xml_file_path + ".part", "wb") as xml_file:
+            xml_file.write(xml_response.content)
+        os.replace(xml_file_path + ".part", xml_file_path)
+
+    return {
+        "etag": xml_response.headers.get("ETag"),
+        "last_modified": xml_response.headers.get("Last-Modified"),
+    }
+
+
+def scrape_data(
+    output_directory_path: str,
+    url: str = FILTERLIST_URL,
+    concurrency: int = 4,
+    requests_per_second: float = 0.2,
+    refresh: bool = False,
+    timeout: float = 60,
+    archive: PlenarprotokollArchive | None = None,
+) -> None:
+    session = create_session(concurrency)
+    # no bursts, the threads only overlap the transfers, the requests stay spaced at
+    # 1 / requests_per_second seconds like the fixed wait of the serial scraper
+    bucket = TokenBucket(rate=requests_per_second)
+
+    # continue at the offset of an interrupted run
+    state = load_state(output_directory_path)
 
     params = {
         "limit": 10,
         "FilterSet": "true",
-        "offset": 0,
+        "offset": state["offset"],
     }
 
     # get maximum number of XML Documents
     data_hits = int(
-        BeautifulSoup(requests.get(url=url, params=params)._content, "html.parser")
+        BeautifulSoup(
+            polite_get(session, bucket, url, params=params, timeout=timeout).content,
+            "html.parser",
+        )
         .find("div", class_="meta-slider")
         .get("data-hits")
     )
 
-    while params["offset"] < data_hits:
-        response = requests.get(url=url, params=params)
-        if response.status_code == HTTPStatus.OK:
-            soup = BeautifulSoup(response.content, "html.parser")
-            for link in soup.find_all("a", attrs={"title": re.compile("^XML")}):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while params["offset"] < data_hits:
+            with run_report.stage("fetch.filterlist"):
+                response = polite_get(
+                    session, bucket, url, params=params, timeout=timeout
+                )
+            if response.status_code == HTTPStatus.OK:
+                soup = BeautifulSoup(response.content, "html.parser")
+                hrefs = [
+                    urljoin(url, link.get("href"))
+                    for link in soup.find_all("a", attrs={"title": re.compile("^XML")})
+                ]
 
-                href = link.get("href")
-                xml_response = requests.get(href)
-                xml_file_name = href.split("/")[-1]
+                futures = {
+                    href: executor.submit(
+                        download_xml,
+                        session,
+                        bucket,
+                        href,
+                        output_directory_path,
+                        state["files"].get(href.split("/")[-1], {}),
+                        refresh,
+                        timeout,
+                        archive,
+                    )
+                    for href in hrefs
+                }
+                for href, future in futures.items():
+                    cache_headers = future.result()
+                    if cache_headers is not None:
+                        state["files"][href.split("/")[-1]] = cache_headers
 
-                with open(
-                    os.path.join(output_directory_path, xml_file_name), "wb"
-                ) as xml_file:
-                    xml_file.write(xml_response.content)
+            params["offset"] += 10
 
-                time.sleep(5)
+            # checkpoint after every completed page
+            state["offset"] = params["offset"]
+            save_state(output_directory_path, state)
 
-            params["offset"] += 10
+    # the next run starts from the newest protocols again
+    state["offset"] = 0
+    save_state(output_directory_path, state)
@@ -0,0 +1,99 @@
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# timers and counters of the stages of a pipeline run, written as json at the end of
+# each pipeline script, the scraper threads share it so updates are locked
+class RunReport:
+    def __init__(self):
+        self.started = time.time()
+        self.stages = defaultdict(lambda: {"seconds": 0.0, "calls": 0})
+        self.counters = defaultdict(int)
+        self.lock = threading.Lock()
+        self.profiler = None
+        self.tracemalloc = False
+
+    def add_time(self, stage: str, seconds: float, calls: int = 1) -> None:
+        with self.lock:
+            self.stages[stage]["seconds"] += seconds
+            self.stages[stage]["calls"] += calls
+
+    @contextmanager
+    def stage(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def count(self, counter: str, value: int = 1) -> None:
+        with self.lock:
+            self.counters[counter] += value
+
+    # modes is a comma separated list like the PROFILE environment variable, e.g.
+    # "cprofile", "tracemalloc" or "cprofile,tracemalloc"
+    def start_profiling(self, modes: str | None) -> None:
+        modes = {mode.strip() for mode in (modes or "").split(",") if mode.strip()}
+        if "cprofile" in modes:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        if "tracemalloc" in modes:
+            tracemalloc.start()
+            self.tracemalloc = True
+
+    def to_dict(self) -> dict:
+        report = {
+            "started": datetime.fromtimestamp(self.started).isoformat(),
+            "seconds": time.time() - self.started,
+            "stages": dict(self.stages),
+            "counters": dict(self.counters),
+        }
+        if self.tracemalloc:
+            current, peak = tracemalloc.get_traced_memory()
+            report["tracemalloc"] = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top_allocations": [
+                    {"location": str(statistic.traceback), "bytes": statistic.size}
+                    for statistic in tracemalloc.take_snapshot().statistics("lineno")[
+                        :20
+                    ]
+                ],
+            }
+        return report
+
+    # write <name>_<timestamp>.json, and <name>_<timestamp>.prof if cProfile ran,
+    # into the report directory
+    def finish(self, name: str, report_directory_path: str | None) -> None:
+        if self.profiler is not None:
+            self.profiler.disable()
+        report = self.to_dict()
+        if self.tracemalloc:
+            tracemalloc.stop()
+        if not report_directory_path:
+            return
+
+        os.makedirs(report_directory_path, exist_ok=True)
+        file_name = f"{name}_{datetime.fromtimestamp(self.started):%Y%m%d_%H%M%S}"
+        with open(
+            os.path.join(report_directory_path, f"{file_name}.json"),
+            "wt",
+            encoding="utf-8",
+        ) as file:
+            json.dump(report, file, indent=4)
+        if self.profiler is not None:
+            self.profiler.dump_stats(
+                os.path.join(report_directory_path, f"{file_name}.prof")
+            )
+
+
+# shared by all stages of the running pipeline script, worker processes have their own
+# instance, so work done inside them is only covered by the timers of the main process
+run_report = RunReport()
@@ -0,0 +1,166 @@
+import re
+
+# reactions of whole fraktionen or of the plenum, mapped to the art they are stored as
+REAKTIONEN = {
+    "Beifall": "beifall",
+    "Heiterkeit": "heiterkeit",
+    "Lachen": "lachen",
+    "Widerspruch": "widerspruch",
+    "Unruhe": "unruhe",
+    "Zurufe": "zuruf",
+    "Zuruf": "zuruf",
+}
+
+# the fraktionen as they appear inside the reactions, mapped to the name used in the
+# brackets of spoken interjections, forms missing here are kept as written
+FRAKTION_PATTERN = re.compile(
+    r"\b(?:CDU/CSU|SPD|AfD|FDP|BSW|BÜNDNIS(?:SES)? 90/DIE GRÜNEN|(?:DIE )?LINKEN?"
+    r"|(?:Die )?Linken?)\b"
+)
+FRAKTION_ALIASES = {
+    "BÜNDNISSES 90/DIE GRÜNEN": "BÜNDNIS 90/DIE GRÜNEN",
+    "LINKE": "DIE LINKE",
+    "LINKEN": "DIE LINKE",
+    "DIE LINKEN": "DIE LINKE",
+    "Linke": "Die Linke",
+    "Linken": "Die Linke",
+    "Die Linken": "Die Linke",
+}
+
+# words qualifying a reaction or an interjection, e.g. "Lebhafter", "Lang anhaltender",
+# "Vereinzelt" or "Weiterer", in any case and with or without an inflected ending
+MODIFIKATOREN = (
+    r"(?:(?i:lebhaft|lang\ ?anhaltend|anhaltend|andauernd|stark|erneut|weiter"
+    r"|vereinzelt|groß|allgemein|leicht|schwach|stürmisch|demonstrativ|kurz)"
+    r"(?:e[mnrs]?)?\ (?:und\ )?)*"
+)
+REAKTION_KIND_PATTERN = re.compile(r"\b(?:" + "|".join(REAKTIONEN) + r")\b")
+
+# parts of a comment that describe what happens in the plenum rather than quoting what
+# was said, e.g. "Glocke des Präsidenten", "Abg. Name [SPD] meldet sich zu einer
+# Zwischenfrage" or "Die Abgeordneten der AfD verlassen den Saal"
+STAGE_NOTE_PATTERN = re.compile(
+    r"Glocke\b|(?:Der |Die )?Abg\.|.*\b(?:meldet sich|melden sich|verlässt|verlassen"
+    r"|erhebt sich|erheben sich)\b"
+)
+REAKTION_WORD_PATTERN = re.compile(
+    r"\b(?:" + "|".join(REAKTIONEN) + r"|Zustimmung|Pfiffe|Buhrufe|Gegenrufe?)\b"
+)
+
+# one pass over the comment, every match is a single interjection up to the next dash
+# separating the interjections, hyphens inside words and names are left alone as the
+# separator has whitespace on both sides, alternatives in order of precedence:
+# - a reaction, e.g. "Beifall bei der SPD sowie bei Abgeordneten der FDP", "Lebhafter
+#   Beifall bei der SPD" or "Heiterkeit und Beifall bei der FDP"
+# - an interjection of a member, e.g. "Name [SPD]: text", "Abg. Name [SPD]: text",
+#   "Zuruf des Abg. Name [SPD]" or "Weiterer Gegenruf des Abg. Name [SPD]: text"
+# - anything else, which is skipped if it is a stage note, e.g. "Glocke des
+#   Präsidenten", and otherwise continues the preceding spoken interjection, e.g.
+#   "Name [SPD]: Frage - Antwort!"
+# the rest of an interjection up to the separating dash, written as runs of non-space
+# characters so there is only one way to match and a failing alternative backtracks
+# in linear time
+SEGMENT = r"\S*(?:\s(?!-\s)\S*)*"
+
+INTERJECTION_PATTERN = re.compile(
+    r"""
+    \s*
+    (?:
+        (?!"""
+    + MODIFIKATOREN
+    + r"""(?:Zurufe?|Gegenrufe?)\ de[rs]\ Abg)
+        """
+    + MODIFIKATOREN
+    + r"""
+        (?P<reaktion>(?:"""
+    + "|".join(REAKTIONEN)
+    + r""")(?:\ und\ """
+    + MODIFIKATOREN
+    + r"""(?:"""
+    + "|".join(REAKTIONEN)
+    + r"""))*)\b
+        (?P<beteiligte>"""
+    + SEGMENT
+    + r""")
+    |
+        (?:"""
+    + MODIFIKATOREN
+    + r"""(?:Zurufe?|Gegenrufe?)\ de[rs]\ Abg\.\s*|Abg\.\s*)?
+        (?P<kommentator>[^\[\]:\s]+(?:\s(?!-\s)[^\[\]:\s]*)*)
+        \[(?P<fraktion>[^\]]+)\]
+        (?:\s*:\s*(?P<text>"""
+    + SEGMENT
+    + r"""))?
+    |
+        (?P<rest>"""
+    + SEGMENT
+    + r""")
+    )
+    (?:\s-\s|$)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def canonical_fraktion(fraktion: str) -> str:
+    return FRAKTION_ALIASES.get(fraktion, fraktion)
+
+
+# a known stage note or a capitalised sentence naming a reaction, e.g. "Die SPD
+# spendet Beifall"
+def is_stage_note(segment: str) -> bool:
+    return STAGE_NOTE_PATTERN.match(segment) is not None or (
+        segment[:1].isupper() and REAKTION_WORD_PATTERN.search(segment) is not None
+    )
+
+
+# split the text of a kommentar element into its interjections, spoken ones keep the
+# commentator and their fraktion, reactions yield one entry per kind of reaction and
+# fraktion taking part with commentator None, and fraktion None if no fraktion is named
+# (e.g. "Heiterkeit")
+def extract_interjections(comment: str) -> list[dict]:
+    comment = comment.strip()
+    if comment.startswith("(") and comment.endswith(")"):
+        comment = comment[1:-1]
+
+    interjections = []
+    for match in INTERJECTION_PATTERN.finditer(comment):
+        if match.group("reaktion") is not None:
+            segment = match.group().strip(" -")
+            arten = dict.fromkeys(
+                REAKTIONEN[reaktion]
+                for reaktion in REAKTION_KIND_PATTERN.findall(match.group("reaktion"))
+            )
+            fraktionen = dict.fromkeys(
+                canonical_fraktion(fraktion)
+                for fraktion in FRAKTION_PATTERN.findall(match.group("beteiligte"))
+            )
+            for art in arten:
+                for fraktion in fraktionen or [None]:
+                    interjections.append(
+                        {
+                            "art": art,
+                            "commentator": None,
+                            "fraktion": fraktion,
+                            "text": segment,
+                        }
+                    )
+        elif match.group("kommentator") is not None:
+            text = match.group("text")
+            interjections.append(
+                {
+                    "art": "zuruf" if text is None else "zwischenruf",
+                    "commentator": match.group("kommentator").strip(),
+                    "fraktion": match.group("fraktion").strip(),
+                    "text": match.group().strip(" -") if text is None else text.strip(),
+                }
+            )
+        elif (
+            match.group("rest")
+            and not is_stage_note(match.group("rest"))
+            and interjections
+            and interjections[-1]["art"] == "zwischenruf"
+        ):
+            interjections[-1]["text"] += " - " + match.group("rest").strip()
+
+    return interjections
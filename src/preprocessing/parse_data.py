@@ -1,54 +1,152 @@
 import json
 import os
 import re
+import time
 import xml.etree.ElementTree as ET
-from collections import defaultdict
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
 
+from src.fetch_data.archive import (
+    ArchiveMember,
+    list_protokolle,
+    open_protokoll,
+    protokoll_size,
+)
+from src.instrumentation.run_report import run_report
+from src.preprocessing.interjections import extract_interjections
+from src.preprocessing.normalize import TextNormalizer, default_normalizer
+from src.preprocessing.registry import Redner, Registry
+
+# compiled once and shared by all parser instances
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+# parse a single file with its own parser instance so it can run in a worker process
+def parse_file(
+    file_path: str | Path | ArchiveMember,
+    normalizer: TextNormalizer = default_normalizer,
+    iterparse: bool = False,
+) -> tuple[dict, Registry]:
+    return PlenarprotokollXMLParser(
+        normalizer=normalizer, iterparse=iterparse
+    ).get_xml_content(file_path)
+
+
+# count the files, bytes, reden and kommentare of a parsed file in the run report
+def count_result(path: Path | ArchiveMember, data: dict) -> None:
+    run_report.count("parse.files")
+    run_report.count("parse.bytes", protokoll_size(path))
+    for sitzung in data.values():
+        for tagesordnungspunkt in sitzung["inhalt"].values():
+            run_report.count("parse.reden", len(tagesordnungspunkt))
+            for rede in tagesordnungspunkt.values():
+                run_report.count("parse.kommentare", len(rede.get("kommentare", {})))
+
 
 class PlenarprotokollXMLParser:
-    def __init__(self):
+    def __init__(
+        self,
+        normalizer: TextNormalizer = default_normalizer,
+        iterparse: bool = False,
+        registry: Registry | None = None,
+    ):
         self.data = dict()
-        self.redner = dict()
-        self.rollen = dict()
-        self.rollen_counter = 1
+        # speakers, roles and fraktionen, pass one read from the database to continue
+        # with the ids of a previous run
+        self.registry = Registry() if registry is None else registry
+        self.normalizer = normalizer
+        # read the files incrementally with bounded memory, see get_xml_content_iterparse
+        self.iterparse = iterparse
 
     # due to the xml-files containing invisible and ambiguous characters they have to be removed
     def remove_bad_chars(self, text: str) -> str:
-        sub_map = {
-            r"[\u00A0]": " ",
-            r"[\u202F]": "",
-            r"[\u2013]": "-",
-            r"[\u201c\u201e]": "'",
-        }
+        return self.normalizer.normalize(text)
 
-        for pattern, substitute in sub_map.items():
-            text = re.compile(pattern=pattern).sub(substitute, text)
+    # spoken interjections and reactions of the fraktionen in the order they appear
+    def extract_spoken_comments(self, comment: str) -> list[dict]:
+        return extract_interjections(comment)
 
-        return text
+    # extract the text, the comments and the speaker of a single rede element, a rede
+    # without a redner paragraph is attributed to the speaker of the previous rede
+    def parse_rede(
+        self, rede: ET.Element, previous_reference: dict | None
+    ) -> tuple[str, dict, dict]:
+        # add two lists, one for the text of the speech the other for comments made by other politicians
+        rede_dict = {"text": []}
+        kommentar_dict = {"kommentare": {}}
+        rede_id = rede.attrib.get("id")
 
-    def extract_spoken_comments(self, comment: str) -> list[dict]:
-        pattern = re.compile(
-            r"([A-Za-zäöüÄÖÜßğ\.\s]+) \[([A-Za-z0-9äöüÄÖÜß\s/]+)\]: (.+)"
-        )
-        segments = comment.split("-")
-        extracted_info = []
-        for segment in segments:
-            matches = pattern.findall(segment)
-            for match in matches:
-                person, party, text = match
-                text = text.rstrip(")")
-                extracted_info.append(
-                    {
-                        "commentator": person.strip(),
-                        "fraktion": party.strip(),
-                        "text": text.strip(),
-                    }
-                )
-        return extracted_info
+        # initialize a comment counter which is later used as an index
+        comment_counter = 0
+
+        # iterate through all paragraphs of a speech
+        for text_paragraph in rede:
+            # check if it is a relevant paragraph for the speech text, if so extend the text list with it
+            if not (
+                text_paragraph.attrib.get("klasse") == "redner"
+                or text_paragraph.tag == "kommentar"
+                or text_paragraph.text is None
+            ):
+                # TODO: <name> Elemente + nachfolgende Rede aus Text parsen
+                rede_paragraph = self.remove_bad_chars(text_paragraph.text)
+                rede_dict["text"].append(rede_paragraph)
 
-    def get_xml_content(self, file_path: str) -> dict:
-        tree = ET.parse(file_path)
+            # else check if it is a comment, if so add it to the list of comments
+            elif text_paragraph.tag == "kommentar":
+                text_paragraph = self.remove_bad_chars(text_paragraph.text)
+                start = time.perf_counter()
+                comments = self.extract_spoken_comments(text_paragraph)
+                run_report.add_time("parse.kommentare", time.perf_counter() - start)
+                for comment in comments:
+                    comment_counter += 1
+                    kommentar_dict["kommentare"][comment_counter] = comment
+
+        if len(kommentar_dict["kommentare"]) > 0:
+            rede_dict.update(kommentar_dict)
+
+        # extract the redner element from the relevant paragraph
+        redner_paragraph = rede.find("p")
+        if redner_paragraph.attrib.get("klasse") != "redner":
+            reference = dict(previous_reference or {})
+            rede_dict["reference"] = reference
+            return rede_id, rede_dict, reference
+
+        redner_element = redner_paragraph.find("redner")
+        redner_id = redner_element.attrib.get("id")
+        name_element = redner_element.find("name")
+
+        # the name element is only read for speakers that aren't known yet
+        if redner_id not in self.registry.redner:
+            fields = {
+                element.tag: self.remove_bad_chars(element.text)
+                for element in name_element
+                if element.tag in Redner.__slots__
+            }
+            self.registry.add_redner(Redner(redner_id, **fields))
+
+        reference = {"redner": self.registry.redner[redner_id].redner_id}
+        # check if the redner has a role in this speech and if so add its id
+        rollen_element = name_element.find("rolle")
+        if rollen_element is not None:
+            beschreibung = WHITESPACE_PATTERN.sub(
+                " ", rollen_element.find("rolle_lang").text
+            )
+            reference["rolle"] = str(self.registry.add_rolle(beschreibung)[0])
+        rede_dict["reference"] = reference
+
+        return rede_id, rede_dict, reference
+
+    # file_path is either a file or a member of a protocol archive
+    def get_xml_content(
+        self, file_path: str | Path | ArchiveMember
+    ) -> tuple[dict, Registry]:
+        if self.iterparse:
+            return self.get_xml_content_iterparse(file_path)
+
+        with open_protokoll(file_path) as file:
+            tree = ET.parse(file)
         root = tree.getroot()
 
         # get the filename attributes from the root element and add as key in dictionary
@@ -67,11 +165,14 @@ class PlenarprotokollXMLParser:
         )
         sitzungsende = sitzung.find("sitzungsende").attrib.get("sitzung-ende-uhrzeit")
         self.data[file_id]["metadaten"] = {
+            "wahlperiode": root.attrib.get("wahlperiode"),
+            "sitzung_nr": root.attrib.get("sitzung-nr"),
             "datum": date,
             "sitzungsbeginn": sitzungsbeginn,
             "sitzungsende": sitzungsende,
         }
 
+        reference = None
         # iterate through all tagesordnungspunkte in a sitzung
         for tagesordnungspunkt in sitzung.findall("tagesordnungspunkt"):
             tagesordnungspunkt_id = tagesordnungspunkt.attrib.get("top-id")
@@ -80,121 +181,241 @@ class PlenarprotokollXMLParser:
 
             # iterate through all rede elements and add them to the corresponding tagesordnungspunkt
             for rede in tagesordnungspunkt.findall("rede"):
-                # add two lists, one for the text of the speech the other for comments made by other politicians
-                rede_dict = {"text": []}
-                kommentar_dict = {"kommentare": {}}
-                reference_dict = {"reference": {}}
-                rede_id = rede.attrib.get("id")
-
-                # initialize a comment counter which is later used as an index
-                comment_counter = 0
-
-                # iterate through all paragraphs of a speech
-                for text_paragraph in rede:
-                    # check if it is a relevant paragraph for the speech text, if so extend the text list with it
-                    if not (
-                        text_paragraph.attrib.get("klasse") == "redner"
-                        or text_paragraph.tag == "kommentar"
-                        or text_paragraph.text is None
-                    ):
-                        # TODO: <name> Elemente + nachfolgende Rede aus Text parsen
-                        rede_paragraph = self.remove_bad_chars(text_paragraph.text)
-                        rede_dict["text"].append(rede_paragraph)
-
-                    # else check if it is a comment, if so add it to the list of comments
-                    elif text_paragraph.tag == "kommentar":
-                        text_paragraph = self.remove_bad_chars(text_paragraph.text)
-                        comments = self.extract_spoken_comments(text_paragraph)
-                        for comment in comments:
-                            comment_counter += 1
-                            kommentar_dict["kommentare"][comment_counter] = comment
-
-                if rede_id not in tagesordnungspunkt_dict[tagesordnungspunkt_id]:
-                    tagesordnungspunkt_dict[tagesordnungspunkt_id][rede_id] = (
-                        defaultdict(dict)
-                    )
-
+                rede_id, rede_dict, reference = self.parse_rede(rede, reference)
                 tagesordnungspunkt_dict[tagesordnungspunkt_id][rede_id] = rede_dict
 
-                if len(kommentar_dict["kommentare"]) > 0:
-                    tagesordnungspunkt_dict[tagesordnungspunkt_id][rede_id].update(
-                        kommentar_dict
+            if len(tagesordnungspunkt_dict[tagesordnungspunkt_id]) > 0:
+                self.data[file_id]["inhalt"].update(tagesordnungspunkt_dict)
+
+        return self.data, self.registry
+
+    # same result as get_xml_content, but the file is read incrementally: every rede is
+    # processed as soon as it is complete, completed elements are dropped right away and
+    # reading stops at the end of the sitzungsverlauf, skipping anlagen and rednerliste
+    def get_xml_content_iterparse(
+        self, file_path: str | Path | ArchiveMember
+    ) -> tuple[dict, Registry]:
+        metadaten = dict()
+        file_id = None
+        tagesordnungspunkt_dict = None
+        reference = None
+        rede_depth = 0
+        # open elements, needed to find the parent of a completed element
+        stack = []
+
+        with open_protokoll(file_path) as file:
+            for event, element in ET.iterparse(file, events=("start", "end")):
+                if event == "start":
+                    stack.append(element)
+                    if len(stack) == 1:
+                        # get the filename attributes from the root element and add as key in dictionary
+                        file_id = (
+                            f"{element.attrib.get('wahlperiode')}"
+                            f"{element.attrib.get('sitzung-nr')}"
+                        )
+                        if file_id not in self.data:
+                            self.data[file_id] = {"metadaten": {}, "inhalt": {}}
+                        metadaten["wahlperiode"] = element.attrib.get("wahlperiode")
+                        metadaten["sitzung_nr"] = element.attrib.get("sitzung-nr")
+                    elif element.tag == "tagesordnungspunkt":
+                        tagesordnungspunkt_dict = {element.attrib.get("top-id"): {}}
+                    elif element.tag == "rede":
+                        rede_depth += 1
+                    continue
+
+                stack.pop()
+                if len(stack) == 0:
+                    break
+                parent = stack[-1]
+
+                if element.tag == "rede" and parent.tag == "tagesordnungspunkt":
+                    rede_id, rede_dict, reference = self.parse_rede(element, reference)
+                    next(iter(tagesordnungspunkt_dict.values()))[rede_id] = rede_dict
+                elif element.tag == "tagesordnungspunkt":
+                    if len(next(iter(tagesordnungspunkt_dict.values()))) > 0:
+                        self.data[file_id]["inhalt"].update(tagesordnungspunkt_dict)
+                elif element.tag == "datum" and parent.tag == "veranstaltungsdaten":
+                    metadaten["datum"] = element.attrib.get("date")
+                elif element.tag == "sitzungsbeginn":
+                    metadaten["sitzungsbeginn"] = element.attrib.get(
+                        "sitzung-start-uhrzeit"
+                    )
+                elif element.tag == "sitzungsende":
+                    metadaten["sitzungsende"] = element.attrib.get(
+                        "sitzung-ende-uhrzeit"
                     )
+                elif element.tag == "sitzungsverlauf":
+                    break
+
+                if element.tag == "rede":
+                    rede_depth -= 1
+                # the content of a rede is needed until the rede itself is complete
+                if rede_depth == 0:
+                    parent.remove(element)
+
+        self.data[file_id]["metadaten"] = {
+            "wahlperiode": metadaten["wahlperiode"],
+            "sitzung_nr": metadaten["sitzung_nr"],
+            "datum": metadaten.get("datum"),
+            "sitzungsbeginn": metadaten.get("sitzungsbeginn"),
+            "sitzungsende": metadaten.get("sitzungsende"),
+        }
+
+        return self.data, self.registry
+
+    # the speakers in the form of redner.json
+    @property
+    def redner(self) -> dict:
+        return self.registry.redner_dict()
+
+    # the roles in the form of rollen.json
+    @property
+    def rollen(self) -> dict:
+        return self.registry.rollen_dict()
+
+    # map the file-local role numbering of a separately parsed file onto the running
+    # numbering and keep the first seen version of every speaker, like the serial run,
+    # returns the speakers, roles and fraktionen that were not known before
+    def reconcile_result(
+        self, data: dict, registry: Registry
+    ) -> tuple[dict, dict, dict]:
+        role_ids = dict()
+        new_rollen = dict()
+        for local_id, beschreibung in registry.rollen.items():
+            rollen_id, new = self.registry.add_rolle(beschreibung)
+            if new:
+                new_rollen.setdefault("rollen", {})[rollen_id] = beschreibung
+            role_ids[str(local_id)] = str(rollen_id)
+
+        # the references only have to be rewritten if the numbering differs
+        if any(local_id != rollen_id for local_id, rollen_id in role_ids.items()):
+            for sitzung in data.values():
+                for tagesordnungspunkt in sitzung["inhalt"].values():
+                    for rede in tagesordnungspunkt.values():
+                        if "rolle" in rede["reference"]:
+                            rede["reference"]["rolle"] = role_ids[
+                                rede["reference"]["rolle"]
+                            ]
 
-                # extract the redner element from the relevant paragraph
-                if rede.find("p").attrib.get("klasse") == "redner":
-                    redner_paragraph = rede.find("p")
-                    redner_element = redner_paragraph.find("redner")
-                    # get the id from the speaker and add it to th relevant dictionary
-                    redner_id = redner_element.attrib.get("id")
-                    redner = {"redner_id": redner_id}
-                    # find the name element, which holds the necessary metainformation
-                    name = redner_element.find("name")
-
-                    # iterate through the elements in the name element and add them to the redner dictionary
-                    for element in name:
-                        # check if the redner has a role and if so adds it to the dict
-                        if element.tag == "rolle":
-                            rollen_element = element.find("rolle_lang").text
-                            rollen_element = re.compile(r"\s+").sub(" ", rollen_element)
-                            if len(list(self.rollen.values())) == 0:
-                                self.rollen["rollen"] = defaultdict()
-                                self.rollen["map"] = defaultdict()
-                            if rollen_element not in self.rollen["rollen"].values():
-                                self.rollen["rollen"][
-                                    self.rollen_counter
-                                ] = rollen_element
-                                self.rollen["map"][rollen_element] = str(
-                                    self.rollen_counter
-                                )
-                                self.rollen_counter += 1
-                        else:
-                            redner[str(element.tag)] = self.remove_bad_chars(
-                                element.text
-                            )
-                    if redner_id not in self.redner.keys():
-                        self.redner[redner_id] = redner
-
-                reference_dict["reference"]["redner"] = redner_id
-                if name.find("rolle") is not None:
-                    reference_dict["reference"]["rolle"] = self.rollen["map"][
-                        rollen_element
-                    ]
-
-                tagesordnungspunkt_dict[tagesordnungspunkt_id][rede_id].update(
-                    reference_dict
+        new_redner = dict()
+        new_fraktionen = dict()
+        for redner_id, redner in registry.redner.items():
+            if redner.fraktion is not None:
+                fraktion_id, new = self.registry.add_fraktion(redner.fraktion)
+                if new:
+                    new_fraktionen[fraktion_id] = self.registry.fraktionen[fraktion_id]
+            if self.registry.add_redner(redner):
+                new_redner[redner_id] = redner.to_dict()
+
+        return new_redner, new_rollen, new_fraktionen
+
+    def merge_result(self, data: dict, registry: Registry) -> None:
+        self.reconcile_result(data, registry)
+
+        for file_id, sitzung in data.items():
+            if file_id in self.data:
+                self.data[file_id]["metadaten"] = sitzung["metadaten"]
+                self.data[file_id]["inhalt"].update(sitzung["inhalt"])
+            else:
+                self.data[file_id] = sitzung
+
+    # yield the independently parsed result of every file in path order
+    def iter_file_results(
+        self, pathlist: list[Path | ArchiveMember], workers: int | None = None
+    ) -> Iterator[tuple[dict, Registry]]:
+        if workers is None or workers <= 1:
+            for path in pathlist:
+                with run_report.stage("parse"):
+                    result = parse_file(path, self.normalizer, self.iterparse)
+                count_result(path, result[0])
+                yield result
+            return
+
+        # only a bounded number of files is in flight, so the results of fast workers
+        # don't pile up in memory while the consumer is still writing earlier ones
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for path in pathlist:
+                pending.append(
+                    (
+                        path,
+                        executor.submit(
+                            parse_file, path, self.normalizer, self.iterparse
+                        ),
+                    )
                 )
+                if len(pending) >= workers * 4:
+                    yield self.wait_for_result(*pending.popleft())
+            while pending:
+                yield self.wait_for_result(*pending.popleft())
 
-            if (
-                tagesordnungspunkt_id not in self.data[file_id]
-                and len(list(tagesordnungspunkt_dict[tagesordnungspunkt_id].values()))
-                > 0
-            ):
-                self.data[file_id]["inhalt"].update(tagesordnungspunkt_dict)
+    # the parse timer of a parallel run covers the time spent waiting for the workers
+    def wait_for_result(
+        self, path: Path | ArchiveMember, future: Future
+    ) -> tuple[dict, Registry]:
+        with run_report.stage("parse"):
+            result = future.result()
+        count_result(path, result[0])
+        return result
+
+    # yield one sitzung at a time together with the speakers and roles it introduced,
+    # nothing is kept in self.data so memory stays flat regardless of the corpus size,
+    # "redner" only holds the speakers new to the registry, which may have been seeded
+    # from the database, consumers look up every referenced speaker in "registry"
+    def iter_sitzungen(
+        self, pathlist: list[Path | ArchiveMember], workers: int | None = None
+    ) -> Iterator[dict]:
+        results = self.iter_file_results(pathlist, workers=workers)
+        for path, (data, registry) in zip(pathlist, results):
+            new_redner, new_rollen, new_fraktionen = self.reconcile_result(
+                data, registry
+            )
+            for sitzungs_key, sitzungs_dict in data.items():
+                yield {
+                    "path": path,
+                    "sitzungs_id": sitzungs_key,
+                    "sitzung": sitzungs_dict,
+                    "redner": new_redner,
+                    "rollen": new_rollen,
+                    "fraktionen": new_fraktionen,
+                    "registry": self.registry,
+                }
 
-        return self.data, self.redner, self.rollen
+    def parse_files(
+        self, pathlist: list[Path | ArchiveMember], workers: int | None = None
+    ) -> None:
+        # every file is parsed independently, serially or across the workers, and the
+        # results are merged in path order so that speakers and role ids don't depend
+        # on the number of workers, the per-file results are counted in the run report
+        for result in self.iter_file_results(pathlist, workers=workers):
+            self.merge_result(*result)
 
-    # iterate through directory to append the data from each file present into one json file
+    # iterate through directory to append the data from each file present into one json file,
+    # the input can also be a protocol archive written by the scraper
     def crawl_directory(
-        self, input_directory_path: str, output_directory_path: str
+        self,
+        input_directory_path: str,
+        output_directory_path: str,
+        workers: int | None = None,
     ) -> None:
-        pathlist = sorted(Path(input_directory_path).rglob("*.xml"))
-
-        for path in pathlist:
-            data, redner, rollen = self.get_xml_content(path)
-            self.data.update(data)
-            self.redner.update(redner)
-            self.rollen.update(rollen)
-
-        with open(
-            os.path.join(output_directory_path, "data.json"), "at", encoding="utf-8"
-        ) as file:
-            json.dump(self.data, file, indent=4, ensure_ascii=False)
-        with open(
-            os.path.join(output_directory_path, "redner.json"), "at", encoding="utf-8"
-        ) as file:
-            json.dump(self.redner, file, indent=4, ensure_ascii=False)
-        with open(
-            os.path.join(output_directory_path, "rollen.json"), "at", encoding="utf-8"
-        ) as file:
-            json.dump(self.rollen, file, indent=4, ensure_ascii=False)
+        pathlist = list_protokolle(input_directory_path)
+
+        self.parse_files(pathlist, workers=workers)
+
+        with run_report.stage("export.json"):
+            with open(
+                os.path.join(output_directory_path, "data.json"), "at", encoding="utf-8"
+            ) as file:
+                json.dump(self.data, file, indent=4, ensure_ascii=False)
+            with open(
+                os.path.join(output_directory_path, "redner.json"),
+                "at",
+                encoding="utf-8",
+            ) as file:
+                json.dump(self.redner, file, indent=4, ensure_ascii=False)
+            with open(
+                os.path.join(output_directory_path, "rollen.json"),
+                "at",
+                encoding="utf-8",
+            ) as file:
+                json.dump(self.rollen, file, indent=4, ensure_ascii=False)
@@ -0,0 +1,147 @@
+import sqlite3
+import sys
+
+
+def intern(text: str | None) -> str | None:
+    return None if text is None else sys.intern(text)
+
+
+# a speaker with the fields of the name element, __slots__ keeps a record at the size
+# of its references and the strings are interned, so the names, titles and fraktionen
+# repeated across thousands of speeches exist only once
+class Redner:
+    __slots__ = (
+        "redner_id",
+        "titel",
+        "vorname",
+        "namenszusatz",
+        "nachname",
+        "ortszusatz",
+        "fraktion",
+        "bdland",
+    )
+
+    def __init__(self, redner_id: str, **fields: str | None):
+        self.redner_id = intern(redner_id)
+        for field in self.__slots__[1:]:
+            setattr(self, field, intern(fields.get(field)))
+
+    # the dict stored in redner.json, only with the fields the name element had
+    def to_dict(self) -> dict:
+        return {
+            field: getattr(self, field)
+            for field in self.__slots__
+            if getattr(self, field) is not None
+        }
+
+
+# speakers, roles and fraktionen seen so far with their ids, roles and fraktionen are
+# numbered in the order they are first seen and can be looked up in both directions
+class Registry:
+    def __init__(self):
+        self.redner = dict()
+        self.rollen = dict()
+        self.rollen_ids = dict()
+        self.fraktionen = dict()
+        self.fraktion_ids = dict()
+        self.next_rollen_id = 1
+        self.next_fraktion_id = 1
+
+    # returns whether the speaker was new, the first seen version of a speaker is kept
+    def add_redner(self, redner: Redner) -> bool:
+        if redner.redner_id in self.redner:
+            return False
+        self.redner[redner.redner_id] = redner
+        if redner.fraktion is not None:
+            self.add_fraktion(redner.fraktion)
+        return True
+
+    # returns the id of the role and whether it was new
+    def add_rolle(
+        self, beschreibung: str, rollen_id: int | None = None
+    ) -> tuple[int, bool]:
+        if beschreibung in self.rollen_ids:
+            return self.rollen_ids[beschreibung], False
+        if rollen_id is None:
+            rollen_id = self.next_rollen_id
+        self.next_rollen_id = max(self.next_rollen_id, rollen_id + 1)
+        beschreibung = intern(beschreibung)
+        self.rollen[rollen_id] = beschreibung
+        self.rollen_ids[beschreibung] = rollen_id
+        return rollen_id, True
+
+    # returns the id of the fraktion and whether it was new
+    def add_fraktion(
+        self, fraktion: str, fraktion_id: int | None = None
+    ) -> tuple[int, bool]:
+        if fraktion in self.fraktion_ids:
+            return self.fraktion_ids[fraktion], False
+        if fraktion_id is None:
+            fraktion_id = self.next_fraktion_id
+        self.next_fraktion_id = max(self.next_fraktion_id, fraktion_id + 1)
+        fraktion = intern(fraktion)
+        self.fraktionen[fraktion_id] = fraktion
+        self.fraktion_ids[fraktion] = fraktion_id
+        return fraktion_id, True
+
+    # the speakers in the form of redner.json
+    def redner_dict(self) -> dict:
+        return {
+            redner_id: redner.to_dict() for redner_id, redner in self.redner.items()
+        }
+
+    # the roles in the form of rollen.json, empty as long as no role was seen
+    def rollen_dict(self) -> dict:
+        if len(self.rollen) == 0:
+            return dict()
+        return {
+            "rollen": dict(self.rollen),
+            "map": {
+                beschreibung: str(rollen_id)
+                for beschreibung, rollen_id in self.rollen_ids.items()
+            },
+        }
+
+    # rebuild the registry from redner.json and rollen.json
+    @classmethod
+    def from_dicts(cls, redner: dict, rollen: dict) -> "Registry":
+        registry = cls()
+        for rollen_id, beschreibung in rollen.get("rollen", {}).items():
+            registry.add_rolle(beschreibung, int(rollen_id))
+        for redner_id, redner_dict in redner.items():
+            fields = {
+                key: value for key, value in redner_dict.items() if key != "redner_id"
+            }
+            registry.add_redner(Redner(str(redner_id), **fields))
+        return registry
+
+    # continue with the ids stored in the database by a previous run
+    @classmethod
+    def from_database(cls, cursor: sqlite3.Cursor) -> "Registry":
+        registry = cls()
+        for fraktion_id, name in cursor.execute(
+            "SELECT fraktion_id, name FROM fraktionen ORDER BY fraktion_id"
+        ):
+            registry.add_fraktion(name, fraktion_id)
+        for rollen_id, beschreibung in cursor.execute(
+            "SELECT rollen_id, beschreibung FROM rollen ORDER BY rollen_id"
+        ):
+            registry.add_rolle(beschreibung, rollen_id)
+        for redner_id, titel, vorname, nachname, fraktion in cursor.execute(
+            """
+            SELECT redner.redner_id, redner.titel, redner.vorname, redner.nachname,
+                fraktionen.name
+            FROM redner
+            LEFT JOIN fraktionen ON fraktionen.fraktion_id = redner.fraktion_id
+        """
+        ):
+            registry.add_redner(
+                Redner(
+                    str(redner_id),
+                    titel=titel,
+                    vorname=vorname,
+                    nachname=nachname,
+                    fraktion=fraktion,
+                )
+            )
+        return registry
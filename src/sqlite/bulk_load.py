@@ -0,0 +1,231 @@
+import sqlite3
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from src.instrumentation.run_report import run_report
+from src.preprocessing.registry import Registry
+from src.sqlite.setup_db import (
+    bump_generation,
+    create_fts_triggers,
+    create_indexes,
+    drop_fts_triggers,
+    drop_indexes,
+    rebuild_fts,
+)
+
+# insert statements per table in the order the buffers are flushed
+insert_statements = {
+    "fraktionen": "INSERT INTO fraktionen (fraktion_id, name) VALUES (?, ?)",
+    "rollen": "INSERT INTO rollen (rollen_id, beschreibung) VALUES (?, ?)",
+    # the fraktionen are flushed before the speakers referencing them
+    "redner": """INSERT INTO redner (redner_id, titel, vorname, nachname, fraktion_id)
+        VALUES (?, ?, ?, ?, (SELECT fraktion_id FROM fraktionen WHERE name = ?))""",
+    "sitzungen": """INSERT INTO sitzungen (sitzungs_id, datum, start, ende)
+        VALUES (?, ?, ?, ?)""",
+    "tagesordnungspunkte": """INSERT INTO tagesordnungspunkte
+        (tagesordnungspunkt_id, name, sitzungs_id) VALUES (?, ?, ?)""",
+    "reden": """INSERT INTO reden
+        (rede_id, text, redner_id, tagesordnungspunkt_id, rollen_id)
+        VALUES (?, ?, ?, ?, ?)""",
+    "kommentare": """INSERT INTO kommentare
+        (kommentar_index, art, kommentator, fraktion, text, rede_id)
+        VALUES (?, ?, ?, ?, ?, ?)""",
+}
+
+
+# share of the sitzungen already in the database a load has to add before rebuilding
+# the indexes and the full-text index is cheaper than updating them row by row
+DEFER_INDEXES_RATIO = 0.25
+
+
+# the indexes are rebuilt over the whole corpus, so they are only deferred for a load
+# into an empty database or one adding a large share of it, the number of sitzungen of
+# a streamed load may be unknown, in which case only an empty database defers them
+def defer_indexes(conn: sqlite3.Connection, new_sitzungen: int | None) -> bool:
+    existing = conn.execute("SELECT COUNT(*) FROM sitzungen").fetchone()[0]
+    if existing == 0:
+        return True
+    return new_sitzungen is not None and new_sitzungen >= existing * DEFER_INDEXES_RATIO
+
+
+# switch to WAL and relaxed syncing while loading and, for large loads, defer the
+# secondary indexes and the full-text index, which are then built once after the load
+# instead of with every row
+@contextmanager
+def bulk_load_settings(conn: sqlite3.Connection, new_sitzungen: int | None = None):
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -65536")
+    deferred = defer_indexes(conn, new_sitzungen)
+    if deferred:
+        drop_indexes(conn.cursor())
+        drop_fts_triggers(conn.cursor())
+    conn.commit()
+    run_report.count("load.indexes_deferred", int(deferred))
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        with run_report.stage("load.indexes"):
+            if deferred:
+                create_indexes(conn.cursor())
+                create_fts_triggers(conn.cursor())
+                rebuild_fts(conn.cursor())
+            bump_generation(conn.cursor())
+            conn.commit()
+        conn.execute("PRAGMA synchronous = FULL")
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+
+
+class BulkLoader:
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        batch_size: int = 5000,
+        transaction_size: int = 50,
+    ):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.batch_size = batch_size
+        self.transaction_size = transaction_size
+        self.rows = {table: [] for table in insert_statements}
+        self.row_counts = defaultdict(int)
+        self.durations = defaultdict(float)
+        self.sitzungen_in_transaction = 0
+
+        # executemany can't return the generated keys, so the tagesordnungspunkt ids
+        # are assigned here, continuing after the ones already in the database
+        self.tagesordnungspunkt_id = self.cursor.execute(
+            "SELECT COALESCE(MAX(tagesordnungspunkt_id), 0) FROM tagesordnungspunkte"
+        ).fetchone()[0]
+
+    def add_row(self, table: str, row: tuple) -> None:
+        self.rows[table].append(row)
+        if len(self.rows[table]) >= self.batch_size:
+            self.flush()
+
+    def add_fraktionen(self, fraktionen: dict) -> None:
+        for fraktion_id, name in fraktionen.items():
+            self.add_row("fraktionen", (int(fraktion_id), name))
+
+    # all speakers, roles and fraktionen of a registry, e.g. one read from json
+    def add_registry(self, registry: Registry) -> None:
+        self.add_fraktionen(registry.fraktionen)
+        self.add_rollen(registry.rollen_dict())
+        self.add_redner(registry.redner_dict())
+
+    def add_rollen(self, rollen: dict) -> None:
+        for key, rolle in rollen.get("rollen", {}).items():
+            self.add_row("rollen", (int(key), rolle))
+
+    def add_redner(self, redner: dict) -> None:
+        for redner_key, redner_value in redner.items():
+            self.add_row(
+                "redner",
+                (
+                    int(redner_key),
+                    redner_value.get("titel"),
+                    redner_value["vorname"],
+                    redner_value["nachname"],
+                    redner_value.get("fraktion"),
+                ),
+            )
+
+    def add_sitzung(self, sitzungs_key: str, sitzungs_dict: dict) -> None:
+        self.add_row(
+            "sitzungen",
+            (
+                int(sitzungs_key),
+                sitzungs_dict["metadaten"]["datum"],
+                sitzungs_dict["metadaten"]["sitzungsbeginn"],
+                sitzungs_dict["metadaten"]["sitzungsende"],
+            ),
+        )
+
+        for (
+            tagesordnungspunkt_key,
+            tagesordnungspunkt_dict,
+        ) in sitzungs_dict["inhalt"].items():
+            self.tagesordnungspunkt_id += 1
+            self.add_row(
+                "tagesordnungspunkte",
+                (self.tagesordnungspunkt_id, tagesordnungspunkt_key, int(sitzungs_key)),
+            )
+
+            for rede_key, rede_values in tagesordnungspunkt_dict.items():
+                self.add_row(
+                    "reden",
+                    (
+                        rede_key,
+                        "\n".join(rede_values["text"]),
+                        rede_values["reference"]["redner"],
+                        self.tagesordnungspunkt_id,
+                        rede_values["reference"].get("rolle"),
+                    ),
+                )
+                for kommentar_key, kommentar_values in rede_values.get(
+                    "kommentare", {}
+                ).items():
+                    self.add_row(
+                        "kommentare",
+                        (
+                            int(kommentar_key),
+                            # data parsed before reactions were extracted has no art
+                            kommentar_values.get("art", "zwischenruf"),
+                            kommentar_values["commentator"],
+                            kommentar_values["fraktion"],
+                            kommentar_values["text"],
+                            rede_key,
+                        ),
+                    )
+
+        # commit after every transaction_size sitzungen
+        self.sitzungen_in_transaction += 1
+        if self.sitzungen_in_transaction >= self.transaction_size:
+            self.commit()
+
+    def flush(self) -> None:
+        for table, rows in self.rows.items():
+            if len(rows) == 0:
+                continue
+            start = time.perf_counter()
+            self.cursor.executemany(insert_statements[table], rows)
+            duration = time.perf_counter() - start
+            self.durations[table] += duration
+            self.row_counts[table] += len(rows)
+            run_report.add_time(f"load.{table}", duration)
+            run_report.count(f"load.rows.{table}", len(rows))
+            rows.clear()
+
+    def commit(self) -> None:
+        self.flush()
+        with run_report.stage("load.commit"):
+            self.conn.commit()
+        self.sitzungen_in_transaction = 0
+
+    # rows, seconds spent in executemany and rows per second for every table
+    def report(self) -> dict:
+        return {
+            table: {
+                "rows": self.row_counts[table],
+                "seconds": self.durations[table],
+                "rows_per_second": (
+                    self.row_counts[table] / self.durations[table]
+                    if self.durations[table] > 0
+                    else 0.0
+                ),
+            }
+            for table in insert_statements
+        }
+
+    def print_report(self) -> None:
+        for table, stats in self.report().items():
+            print(
+                f"{table}: {stats['rows']} rows in {stats['seconds']:.2f}s "
+                f"({stats['rows_per_second']:.0f} rows/s)"
+            )
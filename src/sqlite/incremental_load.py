@@ -0,0 +1,161 @@
+import hashlib
+import sqlite3
+from pathlib import Path
+
+from src.export.columnar_export import export_sitzungen
+from src.fetch_data.archive import ArchiveMember, list_protokolle
+from src.instrumentation.run_report import run_report
+from src.preprocessing.parse_data import PlenarprotokollXMLParser
+from src.preprocessing.registry import Registry
+from src.sqlite.load_data_into_db import (
+    delete_sitzung,
+    insert_fraktionen,
+    insert_redner,
+    insert_rollen,
+    insert_sitzung,
+)
+from src.sqlite.setup_db import bump_generation
+
+
+def file_hash(file_path: str | Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+# size, mtime and hash of a protocol, members of an archive already carry them in the
+# index of the archive, files are only hashed when their size or mtime changed
+def protokoll_stat(
+    path: Path | ArchiveMember, entry: tuple[int, float, str] | None
+) -> tuple[int, float, str | None]:
+    if isinstance(path, ArchiveMember):
+        return path.groesse, path.gespeichert, path.hash
+    stat = path.stat()
+    if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime):
+        return stat.st_size, stat.st_mtime, None
+    return stat.st_size, stat.st_mtime, file_hash(path)
+
+
+# compare the files on disk against the manifest, size and mtime are checked first so
+# only files that were touched have to be hashed
+def find_changed_files(
+    cursor: sqlite3.Cursor, pathlist: list[Path | ArchiveMember]
+) -> tuple[
+    list[tuple[Path | ArchiveMember, int, float, str]],
+    list[tuple[Path | ArchiveMember, int, float, str]],
+]:
+    manifest = {
+        dateipfad: (groesse, mtime, hash)
+        for dateipfad, groesse, mtime, hash in cursor.execute(
+            "SELECT dateipfad, groesse, mtime, hash FROM protokolle"
+        )
+    }
+
+    changed_files = []
+    touched_files = []
+    for path in pathlist:
+        entry = manifest.get(str(path))
+        groesse, mtime, content_hash = protokoll_stat(path, entry)
+        if entry is not None and entry[:2] == (groesse, mtime):
+            continue
+
+        if entry is not None and entry[2] == content_hash:
+            # same content with a new mtime, e.g. after downloading the file again
+            touched_files.append((path, groesse, mtime, content_hash))
+        else:
+            changed_files.append((path, groesse, mtime, content_hash))
+
+    return changed_files, touched_files
+
+
+def update_manifest(
+    cursor: sqlite3.Cursor,
+    path: Path | ArchiveMember,
+    groesse: int,
+    mtime: float,
+    content_hash: str,
+    sitzungs_id: int | None = None,
+) -> None:
+    if sitzungs_id is None:
+        cursor.execute(
+            "UPDATE protokolle SET groesse = ?, mtime = ? WHERE dateipfad = ?",
+            (groesse, mtime, str(path)),
+        )
+        return
+
+    cursor.execute(
+        """
+        INSERT INTO protokolle (dateipfad, groesse, mtime, hash, sitzungs_id)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (dateipfad) DO UPDATE SET
+            groesse = excluded.groesse,
+            mtime = excluded.mtime,
+            hash = excluded.hash,
+            sitzungs_id = excluded.sitzungs_id
+    """,
+        (str(path), groesse, mtime, content_hash, sitzungs_id),
+    )
+
+
+# parse and upsert only the protocols that are new or changed since the last run, the
+# input is a directory of xml files or a protocol archive, the columnar export is
+# updated with the same sitzungen if an output directory is given
+def update_database(
+    input_directory_path: str,
+    database_path: str,
+    workers: int | None = None,
+    iterparse: bool = False,
+    parquet_directory_path: str | None = None,
+) -> None:
+    pathlist = list_protokolle(input_directory_path)
+
+    with sqlite3.connect(database_path) as conn:
+        cursor = conn.cursor()
+
+        with run_report.stage("load.manifest"):
+            changed_files, touched_files = find_changed_files(cursor, pathlist)
+        for path, groesse, mtime, content_hash in touched_files:
+            update_manifest(cursor, path, groesse, mtime, content_hash)
+        conn.commit()
+
+        print(f"{len(changed_files)} of {len(pathlist)} files are new or changed")
+        if len(changed_files) == 0:
+            return
+
+        # continue the numbering of the speakers, roles and fraktionen already stored
+        parser = PlenarprotokollXMLParser(
+            iterparse=iterparse, registry=Registry.from_database(cursor)
+        )
+
+        previous_sitzungen = dict(
+            cursor.execute("SELECT dateipfad, sitzungs_id FROM protokolle")
+        )
+
+        changed_paths = [path for path, _, _, _ in changed_files]
+        sitzungen = parser.iter_sitzungen(changed_paths, workers=workers)
+        if parquet_directory_path is not None:
+            sitzungen = export_sitzungen(sitzungen, parquet_directory_path)
+        # the stream comes first so it is exhausted and the export can write the
+        # redner and sitzungen tables at its end
+        for sitzung, (path, groesse, mtime, content_hash) in zip(
+            sitzungen, changed_files
+        ):
+            with run_report.stage("load.upsert"):
+                insert_fraktionen(cursor, sitzung["fraktionen"])
+                insert_rollen(cursor, sitzung["rollen"])
+                insert_redner(cursor, sitzung["redner"])
+
+                # replace the previous version of the sitzung, if the file was loaded before
+                sitzungs_id = int(sitzung["sitzungs_id"])
+                if str(path) in previous_sitzungen:
+                    delete_sitzung(cursor, previous_sitzungen[str(path)])
+                delete_sitzung(cursor, sitzungs_id)
+                insert_sitzung(cursor, sitzung["sitzungs_id"], sitzung["sitzung"])
+                update_manifest(cursor, path, groesse, mtime, content_hash, sitzungs_id)
+                bump_generation(cursor)
+
+                # commit after every file so an interrupted run keeps its progress
+                conn.commit()
+            run_report.count("load.sitzungen_upserted")
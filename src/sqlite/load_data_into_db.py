@@ -1,111 +1,254 @@
 import json
 import os
 import sqlite3
+import time
+from collections.abc import Iterable
 
+from src.instrumentation.run_report import run_report
+from src.preprocessing.registry import Registry
+from src.sqlite.bulk_load import BulkLoader, bulk_load_settings
 
-def load_data_into_db(json_directory_path: str, database_path: str) -> None:
-    # load file data
-    with open(
-        os.path.join(json_directory_path, "data.json"), "rt", encoding="utf-8"
-    ) as file:
-        data = json.load(file)
-    with open(
-        os.path.join(json_directory_path, "redner.json"), "rt", encoding="utf-8"
-    ) as file:
-        redner = json.load(file)
-    with open(
-        os.path.join(json_directory_path, "rollen.json"), "rt", encoding="utf-8"
-    ) as file:
-        rollen = json.load(file)
-        # connect to the database and initialize cursor to execute SQL statements
-        with sqlite3.connect(database_path) as conn:
-            cursor = conn.cursor()
 
-            # iterate through the roles and add them to the relevant table
-            for key, rolle in rollen["rollen"].items():
-                cursor.execute(
-                    """
-                    INSERT INTO rollen (rollen_id, beschreibung)
-                    VALUES (?, ?)
-                """,
-                    (int(key), rolle),
-                )
+def insert_fraktionen(cursor: sqlite3.Cursor, fraktionen: dict) -> None:
+    for fraktion_id, name in fraktionen.items():
+        cursor.execute(
+            """
+            INSERT INTO fraktionen (fraktion_id, name)
+            VALUES (?, ?)
+        """,
+            (int(fraktion_id), name),
+        )
+
+
+# iterate through the roles and add them to the relevant table
+def insert_rollen(cursor: sqlite3.Cursor, rollen: dict) -> None:
+    for key, rolle in rollen.get("rollen", {}).items():
+        cursor.execute(
+            """
+            INSERT INTO rollen (rollen_id, beschreibung)
+            VALUES (?, ?)
+        """,
+            (int(key), rolle),
+        )
+
 
-            # iterate through unique_redner_list and add each item to the redner table
-            for redner_key, redner_value in redner.items():
+# iterate through unique_redner_list and add each item to the redner table, the
+# fraktion of a speaker has to be inserted before them
+def insert_redner(cursor: sqlite3.Cursor, redner: dict) -> None:
+    for redner_key, redner_value in redner.items():
+        cursor.execute(
+            """
+            INSERT INTO redner (redner_id, titel, vorname, nachname, fraktion_id)
+            VALUES (?, ?, ?, ?, (SELECT fraktion_id FROM fraktionen WHERE name = ?))
+        """,
+            (
+                int(redner_key),
+                redner_value.get("titel"),
+                redner_value["vorname"],
+                redner_value["nachname"],
+                redner_value.get("fraktion"),
+            ),
+        )
+
+
+# add the metadata of a sitzung and all of its tagesordnungspunkte, reden and kommentare
+def insert_sitzung(
+    cursor: sqlite3.Cursor, sitzungs_key: str, sitzungs_dict: dict
+) -> None:
+    cursor.execute(
+        """
+        INSERT INTO sitzungen (sitzungs_id, datum, start, ende)
+        VALUES (?, ?, ?, ?)
+    """,
+        (
+            int(sitzungs_key),
+            sitzungs_dict["metadaten"]["datum"],
+            sitzungs_dict["metadaten"]["sitzungsbeginn"],
+            sitzungs_dict["metadaten"]["sitzungsende"],
+        ),
+    )
+
+    # iterate through the tagesordnungspunkte in each sitzung and add the foreign key
+    for (
+        tagesordnungspunkt_key,
+        tagesordnungspunkt_dict,
+    ) in sitzungs_dict["inhalt"].items():
+        cursor.execute(
+            """
+            INSERT INTO tagesordnungspunkte (name, sitzungs_id)
+            VALUES (?, ?)
+        """,
+            (tagesordnungspunkt_key, int(sitzungs_key)),
+        )
+        tagesordnungspunkt_id = cursor.lastrowid
+
+        # iterate through all reden in each tagesordnungspunkt and add the foreign key to it, the speaker and their role if they have one
+        for rede_key, rede_values in tagesordnungspunkt_dict.items():
+            cursor.execute(
+                """
+                INSERT INTO reden (rede_id, text, redner_id, tagesordnungspunkt_id, rollen_id)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (
+                    rede_key,
+                    "\n".join(rede_values["text"]),
+                    rede_values["reference"]["redner"],
+                    tagesordnungspunkt_id,
+                    rede_values["reference"].get("rolle"),
+                ),
+            )
+            for kommentar_key, kommentar_values in rede_values.get(
+                "kommentare", {}
+            ).items():
                 cursor.execute(
                     """
-                    INSERT INTO redner (redner_id, titel, vorname, nachname, fraktion)
-                    VALUES (?, ?, ?, ?, ?)
+                    INSERT INTO kommentare (kommentar_index, art, kommentator, fraktion, text, rede_id)
+                    VALUES (?, ?, ?, ?, ?, ?)
                 """,
                     (
-                        int(redner_key),
-                        redner_value.get("titel"),
-                        redner_value["vorname"],
-                        redner_value["nachname"],
-                        redner_value.get("fraktion"),
+                        int(kommentar_key),
+                        kommentar_values.get("art", "zwischenruf"),
+                        kommentar_values["commentator"],
+                        kommentar_values["fraktion"],
+                        kommentar_values["text"],
+                        rede_key,
                     ),
                 )
 
+
+# remove a sitzung with everything that references it so it can be inserted again
+def delete_sitzung(cursor: sqlite3.Cursor, sitzungs_id: int) -> None:
+    cursor.execute(
+        """
+        DELETE FROM kommentare WHERE rede_id IN (
+            SELECT rede_id FROM reden WHERE tagesordnungspunkt_id IN (
+                SELECT tagesordnungspunkt_id FROM tagesordnungspunkte WHERE sitzungs_id = ?
+            )
+        )
+    """,
+        (sitzungs_id,),
+    )
+    cursor.execute(
+        """
+        DELETE FROM reden WHERE tagesordnungspunkt_id IN (
+            SELECT tagesordnungspunkt_id FROM tagesordnungspunkte WHERE sitzungs_id = ?
+        )
+    """,
+        (sitzungs_id,),
+    )
+    cursor.execute(
+        "DELETE FROM tagesordnungspunkte WHERE sitzungs_id = ?", (sitzungs_id,)
+    )
+    cursor.execute("DELETE FROM sitzungen WHERE sitzungs_id = ?", (sitzungs_id,))
+
+
+# the speakers, roles and fraktionen already in the database, passed to the parser so
+# new ones continue their numbering
+def read_registry(database_path: str) -> Registry:
+    with sqlite3.connect(database_path) as conn:
+        return Registry.from_database(conn.cursor())
+
+
+def load_data_into_db(
+    json_directory_path: str,
+    database_path: str,
+    batch_size: int = 5000,
+    transaction_size: int = 50,
+) -> None:
+    # load file data
+    with run_report.stage("load.read_json"):
+        with open(
+            os.path.join(json_directory_path, "data.json"), "rt", encoding="utf-8"
+        ) as file:
+            data = json.load(file)
+        with open(
+            os.path.join(json_directory_path, "redner.json"), "rt", encoding="utf-8"
+        ) as file:
+            redner = json.load(file)
+        with open(
+            os.path.join(json_directory_path, "rollen.json"), "rt", encoding="utf-8"
+        ) as file:
+            rollen = json.load(file)
+
+    # connect to the database and load everything in batches with the bulk loader
+    with sqlite3.connect(database_path) as conn:
+        with bulk_load_settings(conn, new_sitzungen=len(data)):
+            loader = BulkLoader(
+                conn, batch_size=batch_size, transaction_size=transaction_size
+            )
+            loader.add_registry(Registry.from_dicts(redner, rollen))
+
             # iterate through the sitzungen and add the relevant metadata to the database
             for sitzungs_key, sitzungs_dict in data.items():
-                cursor.execute(
-                    """
-                    INSERT INTO sitzungen (sitzungs_id, datum, start, ende)
-                    VALUES (?, ?, ?, ?)
-                """,
-                    (
-                        int(sitzungs_key),
-                        sitzungs_dict["metadaten"]["datum"],
-                        sitzungs_dict["metadaten"]["sitzungsbeginn"],
-                        sitzungs_dict["metadaten"]["sitzungsende"],
-                    ),
+                loader.add_sitzung(sitzungs_key, sitzungs_dict)
+            loader.commit()
+    loader.print_report()
+
+
+# write the sitzungen yielded by PlenarprotokollXMLParser.iter_sitzungen straight into
+# the database in batches, committing every transaction_size sitzungen, optionally
+# also exporting them as json, expected_sitzungen (e.g. the number of files) decides
+# whether the indexes are deferred
+def load_sitzungen_into_db(
+    sitzungen: Iterable[dict],
+    database_path: str,
+    batch_size: int = 5000,
+    transaction_size: int = 50,
+    json_directory_path: str | None = None,
+    expected_sitzungen: int | None = None,
+) -> None:
+    registry = None
+    json_file = None
+    if json_directory_path is not None:
+        json_file = open(
+            os.path.join(json_directory_path, "data.json"), "wt", encoding="utf-8"
+        )
+        json_file.write("{")
+
+    try:
+        with sqlite3.connect(database_path) as conn:
+            with bulk_load_settings(conn, new_sitzungen=expected_sitzungen):
+                loader = BulkLoader(
+                    conn, batch_size=batch_size, transaction_size=transaction_size
                 )
 
-                # iterate through the tagesordnungspunkte in each sitzung and add the foreign key
-                for (
-                    tagesordnungspunkt_key,
-                    tagesordnungspunkt_dict,
-                ) in sitzungs_dict["inhalt"].items():
-                    cursor.execute(
-                        """
-                        INSERT INTO tagesordnungspunkte (name, sitzungs_id)
-                        VALUES (?, ?)
-                    """,
-                        (tagesordnungspunkt_key, int(sitzungs_key)),
-                    )
-                    tagesordnungspunkt_id = cursor.lastrowid
-
-                    # iterate through all reden in each tagesordnungspunkt and add the foreign key to it, the speaker and their role if they have one
-                    for rede_key, rede_values in tagesordnungspunkt_dict.items():
-                        # if "rolle" in rede_values["reference"]:
-                        cursor.execute(
-                            """
-                            INSERT INTO reden (rede_id, text, redner_id, tagesordnungspunkt_id, rollen_id)
-                            VALUES (?, ?, ?, ?, ?)
-                        """,
-                            (
-                                rede_key,
-                                "\n".join(rede_values["text"]),
-                                rede_values["reference"]["redner"],
-                                tagesordnungspunkt_id,
-                                rede_values["reference"].get("rolle"),
-                            ),
+                for index, sitzung in enumerate(sitzungen):
+                    loader.add_fraktionen(sitzung.get("fraktionen", {}))
+                    loader.add_rollen(sitzung["rollen"])
+                    loader.add_redner(sitzung["redner"])
+                    loader.add_sitzung(sitzung["sitzungs_id"], sitzung["sitzung"])
+
+                    if json_file is not None:
+                        json_start = time.perf_counter()
+                        if index > 0:
+                            json_file.write(",")
+                        json_file.write(
+                            f"{json.dumps(sitzung['sitzungs_id'])}: "
+                            f"{json.dumps(sitzung['sitzung'], ensure_ascii=False)}"
                         )
-                        for kommentar_key, kommentar_values in rede_values.get(
-                            "kommentare", {}
-                        ).items():
-                            cursor.execute(
-                                """
-                                INSERT INTO kommentare (kommentar_index, kommentator, fraktion, text, rede_id)
-                                VALUES (?, ?, ?, ?, ?)
-                            """,
-                                (
-                                    int(kommentar_key),
-                                    kommentar_values["commentator"],
-                                    kommentar_values["fraktion"],
-                                    kommentar_values["text"],
-                                    rede_key,
-                                ),
-                            )
-            conn.commit()
+                        registry = sitzung["registry"]
+                        run_report.add_time(
+                            "export.json", time.perf_counter() - json_start
+                        )
+
+                loader.commit()
+    finally:
+        if json_file is not None:
+            json_file.write("}")
+            json_file.close()
+
+    loader.print_report()
+
+    # the speakers and roles of the whole registry, including the ones that were
+    # already in the database and thus not new to any of the sitzungen
+    if json_directory_path is not None:
+        if registry is None:
+            registry = read_registry(database_path)
+        with open(
+            os.path.join(json_directory_path, "redner.json"), "wt", encoding="utf-8"
+        ) as file:
+            json.dump(registry.redner_dict(), file, ensure_ascii=False)
+        with open(
+            os.path.join(json_directory_path, "rollen.json"), "wt", encoding="utf-8"
+        ) as file:
+            json.dump(registry.rollen_dict(), file, ensure_ascii=False)
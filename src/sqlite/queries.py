@@ -0,0 +1,260 @@
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.analysis.comment_statistics import statistics_queries
+from src.sqlite.setup_db import ISO_DATUM
+
+REDEN_COLUMNS = """
+    reden.rede_id,
+    reden.text,
+    reden.rollen_id,
+    redner.redner_id,
+    redner.titel,
+    redner.vorname,
+    redner.nachname,
+    redner.fraktion_id,
+    fraktionen.name AS fraktion,
+    tagesordnungspunkte.tagesordnungspunkt_id,
+    tagesordnungspunkte.name AS tagesordnungspunkt,
+    sitzungen.sitzungs_id,
+    sitzungen.datum
+"""
+REDEN_JOINS = """
+    JOIN redner ON redner.redner_id = reden.redner_id
+    LEFT JOIN fraktionen ON fraktionen.fraktion_id = redner.fraktion_id
+    JOIN tagesordnungspunkte
+        ON tagesordnungspunkte.tagesordnungspunkt_id = reden.tagesordnungspunkt_id
+    JOIN sitzungen ON sitzungen.sitzungs_id = tagesordnungspunkte.sitzungs_id
+"""
+
+# the read queries by name, the statements are constant so every pooled connection
+# prepares each of them once and reuses it from its statement cache
+query_statements = {
+    "reden_redner": f"""
+        SELECT {REDEN_COLUMNS}
+        FROM reden {REDEN_JOINS}
+        WHERE reden.redner_id = :redner_id
+        ORDER BY {ISO_DATUM}, reden.rowid
+        LIMIT :limit OFFSET :offset
+    """,
+    "reden_tagesordnungspunkt": f"""
+        SELECT {REDEN_COLUMNS}
+        FROM reden {REDEN_JOINS}
+        WHERE reden.tagesordnungspunkt_id = :tagesordnungspunkt_id
+        ORDER BY reden.rowid
+    """,
+    # datum_von and datum_bis are iso dates (yyyy-mm-dd), both inclusive
+    "reden_zeitraum": f"""
+        SELECT {REDEN_COLUMNS}
+        FROM reden {REDEN_JOINS}
+        WHERE {ISO_DATUM} BETWEEN :datum_von AND :datum_bis
+        ORDER BY {ISO_DATUM}, reden.rowid
+        LIMIT :limit OFFSET :offset
+    """,
+    "kommentare_fraktion": f"""
+        SELECT
+            kommentare.kommentar_id,
+            kommentare.kommentar_index,
+            kommentare.art,
+            kommentare.kommentator,
+            kommentare.fraktion,
+            kommentare.text,
+            kommentare.rede_id,
+            reden.redner_id,
+            sitzungen.sitzungs_id,
+            sitzungen.datum
+        FROM kommentare
+        JOIN reden ON reden.rede_id = kommentare.rede_id
+        JOIN tagesordnungspunkte
+            ON tagesordnungspunkte.tagesordnungspunkt_id = reden.tagesordnungspunkt_id
+        JOIN sitzungen ON sitzungen.sitzungs_id = tagesordnungspunkte.sitzungs_id
+        WHERE kommentare.fraktion = :fraktion
+            AND (:art IS NULL OR kommentare.art = :art)
+        ORDER BY {ISO_DATUM}, kommentare.kommentar_id
+        LIMIT :limit OFFSET :offset
+    """,
+    "sitzungen": f"""
+        SELECT
+            sitzungen.sitzungs_id,
+            sitzungen.datum,
+            sitzungen.start,
+            sitzungen.ende,
+            COUNT(DISTINCT tagesordnungspunkte.tagesordnungspunkt_id)
+                AS anzahl_tagesordnungspunkte,
+            COUNT(reden.rede_id) AS anzahl_reden
+        FROM sitzungen
+        LEFT JOIN tagesordnungspunkte
+            ON tagesordnungspunkte.sitzungs_id = sitzungen.sitzungs_id
+        LEFT JOIN reden
+            ON reden.tagesordnungspunkt_id = tagesordnungspunkte.tagesordnungspunkt_id
+        WHERE :sitzungs_id IS NULL OR sitzungen.sitzungs_id = :sitzungs_id
+        GROUP BY sitzungen.sitzungs_id
+        ORDER BY {ISO_DATUM}, sitzungen.sitzungs_id
+    """,
+    **statistics_queries,
+}
+
+
+# read-only access for dashboards and other consumers, a fixed pool of connections
+# shares an LRU cache of query results, the cache is dropped whenever the generation
+# in datenstand changed, i.e. after every load, and concurrent calls of the same query
+# wait for the one already running instead of running the joins again
+class QueryService:
+    def __init__(
+        self,
+        database_path: str,
+        pool_size: int = 4,
+        cache_size: int = 256,
+        mmap_size: int = 256 * 1024 * 1024,
+    ):
+        self.database_uri = Path(database_path).resolve().as_uri() + "?mode=ro"
+        self.mmap_size = mmap_size
+        self.pool = queue.Queue()
+        for _ in range(pool_size):
+            self.pool.put(self.connect())
+
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.running = dict()
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.database_uri,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=len(query_statements) + 8,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self.pool.get()
+        try:
+            yield conn
+        finally:
+            self.pool.put(conn)
+
+    def current_generation(self) -> int:
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT generation FROM datenstand WHERE id = 1"
+            ).fetchone()
+        return 0 if row is None else row[0]
+
+    def query(self, name: str, **params) -> list[dict]:
+        if name not in query_statements:
+            raise ValueError(f"unknown query {name}")
+
+        generation = self.current_generation()
+        key = (name, tuple(sorted(params.items())))
+        with self.lock:
+            if generation != self.generation:
+                self.cache.clear()
+                self.generation = generation
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return [dict(row) for row in self.cache[key]]
+            future = self.running.get((generation, key))
+            running = future is not None
+            if running:
+                self.hits += 1
+            else:
+                future = Future()
+                self.running[(generation, key)] = future
+                self.misses += 1
+
+        if running:
+            rows = future.result()
+        else:
+            try:
+                with self.connection() as conn:
+                    rows = conn.execute(query_statements[name], params).fetchall()
+                future.set_result(rows)
+            except BaseException as exception:
+                future.set_exception(exception)
+                raise
+            finally:
+                with self.lock:
+                    del self.running[(generation, key)]
+            with self.lock:
+                if generation == self.generation:
+                    self.cache[key] = rows
+                    while len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+
+        return [dict(row) for row in rows]
+
+    def reden_by_redner(
+        self, redner_id: int, limit: int = 100, offset: int = 0
+    ) -> list[dict]:
+        return self.query(
+            "reden_redner", redner_id=redner_id, limit=limit, offset=offset
+        )
+
+    def reden_by_tagesordnungspunkt(self, tagesordnungspunkt_id: int) -> list[dict]:
+        return self.query(
+            "reden_tagesordnungspunkt", tagesordnungspunkt_id=tagesordnungspunkt_id
+        )
+
+    def reden_by_datum(
+        self, datum_von: str, datum_bis: str, limit: int = 100, offset: int = 0
+    ) -> list[dict]:
+        return self.query(
+            "reden_zeitraum",
+            datum_von=datum_von,
+            datum_bis=datum_bis,
+            limit=limit,
+            offset=offset,
+        )
+
+    # art restricts to e.g. 'zwischenruf' or 'beifall', all kinds if None
+    def kommentare_by_fraktion(
+        self, fraktion: str, art: str | None = None, limit: int = 100, offset: int = 0
+    ) -> list[dict]:
+        return self.query(
+            "kommentare_fraktion",
+            fraktion=fraktion,
+            art=art,
+            limit=limit,
+            offset=offset,
+        )
+
+    def sitzungen(self) -> list[dict]:
+        return self.query("sitzungen", sitzungs_id=None)
+
+    def sitzung(self, sitzungs_id: int) -> dict | None:
+        rows = self.query("sitzungen", sitzungs_id=sitzungs_id)
+        return rows[0] if rows else None
+
+    # one of the aggregations of comment_statistics, always computed from the current
+    # data instead of the materialized summary tables
+    def statistic(self, name: str) -> list[dict]:
+        if name not in statistics_queries:
+            raise ValueError(f"unknown statistic {name}")
+        return self.query(name)
+
+    def cache_info(self) -> dict:
+        with self.lock:
+            return {
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.cache),
+            }
+
+    def close(self) -> None:
+        while not self.pool.empty():
+            self.pool.get().close()
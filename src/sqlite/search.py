@@ -0,0 +1,72 @@
+import sqlite3
+
+
+# full-text search over the speeches, ranked by bm25, with the speaker, their party
+# and the date of the sitzung joined, the query uses the FTS5 syntax, e.g.
+# '"erneuerbare Energien" AND Wasserstoff' or 'Klima*'
+def search_reden(database_path: str, query: str, limit: int = 20) -> list[dict]:
+    with sqlite3.connect(database_path) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            """
+            SELECT
+                reden.rede_id,
+                snippet(reden_fts, 0, '[', ']', '...', 16) AS ausschnitt,
+                reden_fts.rank AS rang,
+                redner.redner_id,
+                redner.titel,
+                redner.vorname,
+                redner.nachname,
+                redner.fraktion_id,
+                fraktionen.name AS fraktion,
+                sitzungen.sitzungs_id,
+                sitzungen.datum,
+                tagesordnungspunkte.name AS tagesordnungspunkt
+            FROM reden_fts
+            JOIN reden ON reden.rowid = reden_fts.rowid
+            JOIN redner ON redner.redner_id = reden.redner_id
+            LEFT JOIN fraktionen ON fraktionen.fraktion_id = redner.fraktion_id
+            JOIN tagesordnungspunkte
+                ON tagesordnungspunkte.tagesordnungspunkt_id = reden.tagesordnungspunkt_id
+            JOIN sitzungen ON sitzungen.sitzungs_id = tagesordnungspunkte.sitzungs_id
+            WHERE reden_fts MATCH ?
+            ORDER BY reden_fts.rank
+            LIMIT ?
+        """,
+            (query, limit),
+        ).fetchall()
+
+    return [dict(row) for row in rows]
+
+
+# full-text search over the interjections, ranked by bm25, with the speech they were
+# made in and the date of the sitzung joined
+def search_kommentare(database_path: str, query: str, limit: int = 20) -> list[dict]:
+    with sqlite3.connect(database_path) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            """
+            SELECT
+                kommentare.kommentar_id,
+                kommentare.kommentator,
+                kommentare.fraktion,
+                kommentare.text,
+                kommentare_fts.rank AS rang,
+                kommentare.rede_id,
+                reden.redner_id,
+                sitzungen.sitzungs_id,
+                sitzungen.datum
+            FROM kommentare_fts
+            JOIN kommentare ON kommentare.kommentar_id = kommentare_fts.rowid
+            JOIN reden ON reden.rede_id = kommentare.rede_id
+            JOIN tagesordnungspunkte
+                ON tagesordnungspunkte.tagesordnungspunkt_id = reden.tagesordnungspunkt_id
+            JOIN sitzungen ON sitzungen.sitzungs_id = tagesordnungspunkte.sitzungs_id
+            WHERE kommentare_fts MATCH ?
+            ORDER BY kommentare_fts.rank
+            LIMIT ?
+        """,
+            (query, limit),
+        ).fetchall()
+
+    return [dict(row) for row in rows]
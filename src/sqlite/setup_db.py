@@ -14,12 +14,18 @@ sql_statements = [
             sitzungs_id INTEGER NOT NULL,
             FOREIGN KEY (sitzungs_id) REFERENCES sitzungen (sitzungs_id)
         );""",
+    # ids of the fraktionen of the speakers, stable across runs
+    """CREATE TABLE IF NOT EXISTS fraktionen(
+            fraktion_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        );""",
     """CREATE TABLE IF NOT EXISTS redner(
             redner_id INTEGER PRIMARY KEY NOT NULL,
             titel TEXT,
             vorname TEXT NOT NULL,
             nachname TEXT NOT NULL,
-            fraktion TEXT
+            fraktion_id INTEGER,
+            FOREIGN KEY (fraktion_id) REFERENCES fraktionen (fraktion_id)
         );""",
     """CREATE TABLE IF NOT EXISTS rollen(
             rollen_id INTEGER PRIMARY KEY,
@@ -35,20 +41,256 @@ sql_statements = [
             FOREIGN KEY (tagesordnungspunkt_id) REFERENCES tagesordnungspunkte (tagesordnungspunkt_id),
             FOREIGN KEY (rollen_id) REFERENCES rollen (rollen_id)
         );""",
+    # spoken interjections (art 'zwischenruf') and reactions like 'beifall' or 'zuruf',
+    # reactions of a fraktion have no kommentator and reactions of the plenum neither a
+    # fraktion
     """CREATE TABLE IF NOT EXISTS kommentare(
             kommentar_id INTEGER PRIMARY KEY,
             kommentar_index INTEGER NOT NULL,
-            kommentator TEXT NOT NULL,
-            fraktion TEXT NOT NULL,
+            art TEXT NOT NULL DEFAULT 'zwischenruf',
+            kommentator TEXT,
+            fraktion TEXT,
             text TEXT NOT NULL,
             rede_id TEXT NOT NULL,
             FOREIGN KEY (rede_id) REFERENCES reden (rede_id),
             UNIQUE (kommentar_index, rede_id)
         );""",
+    # manifest of the loaded protocol files, used to only re-parse new or changed files
+    """CREATE TABLE IF NOT EXISTS protokolle(
+            dateipfad TEXT PRIMARY KEY NOT NULL,
+            groesse INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            hash TEXT NOT NULL,
+            sitzungs_id INTEGER NOT NULL,
+            FOREIGN KEY (sitzungs_id) REFERENCES sitzungen (sitzungs_id)
+        );""",
+    # term-frequency index, sparse counts of every term per rede
+    """CREATE TABLE IF NOT EXISTS terme(
+            term_id INTEGER PRIMARY KEY,
+            term TEXT NOT NULL UNIQUE
+        );""",
+    """CREATE TABLE IF NOT EXISTS termfrequenzen(
+            rede_id TEXT NOT NULL,
+            term_id INTEGER NOT NULL,
+            anzahl INTEGER NOT NULL,
+            PRIMARY KEY (rede_id, term_id),
+            FOREIGN KEY (rede_id) REFERENCES reden (rede_id),
+            FOREIGN KEY (term_id) REFERENCES terme (term_id)
+        ) WITHOUT ROWID;""",
+    # text hash of every indexed rede, to only index new or changed reden
+    """CREATE TABLE IF NOT EXISTS termindex_reden(
+            rede_id TEXT PRIMARY KEY NOT NULL,
+            text_hash TEXT NOT NULL
+        );""",
+    # similarity index, the minhash signature of every rede together with the hash of
+    # the text and the parameters it was computed from, and the lsh bucket of every
+    # band of the signature, reden sharing a bucket are candidates for near-duplicates
+    """CREATE TABLE IF NOT EXISTS minhash_signaturen(
+            rede_id TEXT PRIMARY KEY NOT NULL,
+            text_hash TEXT NOT NULL,
+            signatur BLOB NOT NULL,
+            FOREIGN KEY (rede_id) REFERENCES reden (rede_id)
+        );""",
+    """CREATE TABLE IF NOT EXISTS lsh_buckets(
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            rede_id TEXT NOT NULL,
+            PRIMARY KEY (band, bucket, rede_id),
+            FOREIGN KEY (rede_id) REFERENCES reden (rede_id)
+        ) WITHOUT ROWID;""",
+    # a single row counting the loads, readers caching query results compare it to
+    # notice that the data changed
+    """CREATE TABLE IF NOT EXISTS datenstand(
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL,
+            geaendert TEXT
+        );""",
+]
+
+# dates are stored like they appear in the protocols (dd.mm.yyyy), this turns them into
+# sortable iso dates for range filters
+ISO_DATUM = (
+    "substr(sitzungen.datum, 7, 4) || '-' || substr(sitzungen.datum, 4, 2) "
+    "|| '-' || substr(sitzungen.datum, 1, 2)"
+)
+
+# secondary indexes, created after the tables and dropped during bulk loads, the
+# extra columns make them covering for the usual joins and aggregations
+index_statements = {
+    "idx_tagesordnungspunkte_sitzungs_id": """CREATE INDEX IF NOT EXISTS
+        idx_tagesordnungspunkte_sitzungs_id ON tagesordnungspunkte (sitzungs_id);""",
+    "idx_reden_redner_id": """CREATE INDEX IF NOT EXISTS
+        idx_reden_redner_id ON reden (redner_id, tagesordnungspunkt_id);""",
+    "idx_reden_tagesordnungspunkt_id": """CREATE INDEX IF NOT EXISTS
+        idx_reden_tagesordnungspunkt_id ON reden (tagesordnungspunkt_id, redner_id);""",
+    "idx_kommentare_rede_id": """CREATE INDEX IF NOT EXISTS
+        idx_kommentare_rede_id ON kommentare (rede_id, fraktion);""",
+    "idx_kommentare_fraktion": """CREATE INDEX IF NOT EXISTS
+        idx_kommentare_fraktion ON kommentare (fraktion, rede_id);""",
+    "idx_lsh_buckets_rede_id": """CREATE INDEX IF NOT EXISTS
+        idx_lsh_buckets_rede_id ON lsh_buckets (rede_id);""",
+}
+
+# tokenizer of the full-text tables, unicode61 keeps umlauts and ß intact, alternatives
+# are "unicode61 remove_diacritics 2" to also match words written without umlauts or
+# "trigram" to match parts of german compound words like "klimaschutz" in
+# "Klimaschutzgesetz" at the cost of a larger index
+FTS_TOKENIZE = "unicode61 remove_diacritics 0"
+
+# full-text tables reading their content from reden and kommentare
+fts_statements = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS reden_fts USING fts5(
+            text,
+            content='reden',
+            content_rowid='rowid',
+            tokenize='{tokenize}'
+        );""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS kommentare_fts USING fts5(
+            text,
+            content='kommentare',
+            content_rowid='kommentar_id',
+            tokenize='{tokenize}'
+        );""",
 ]
 
+# triggers keeping the full-text tables in sync, dropped during bulk loads after which
+# the full-text tables are rebuilt once
+fts_trigger_statements = {
+    "reden_fts_insert": """CREATE TRIGGER IF NOT EXISTS reden_fts_insert
+        AFTER INSERT ON reden BEGIN
+            INSERT INTO reden_fts (rowid, text) VALUES (new.rowid, new.text);
+        END;""",
+    "reden_fts_delete": """CREATE TRIGGER IF NOT EXISTS reden_fts_delete
+        AFTER DELETE ON reden BEGIN
+            INSERT INTO reden_fts (reden_fts, rowid, text)
+            VALUES ('delete', old.rowid, old.text);
+        END;""",
+    "reden_fts_update": """CREATE TRIGGER IF NOT EXISTS reden_fts_update
+        AFTER UPDATE ON reden BEGIN
+            INSERT INTO reden_fts (reden_fts, rowid, text)
+            VALUES ('delete', old.rowid, old.text);
+            INSERT INTO reden_fts (rowid, text) VALUES (new.rowid, new.text);
+        END;""",
+    "kommentare_fts_insert": """CREATE TRIGGER IF NOT EXISTS kommentare_fts_insert
+        AFTER INSERT ON kommentare BEGIN
+            INSERT INTO kommentare_fts (rowid, text)
+            VALUES (new.kommentar_id, new.text);
+        END;""",
+    "kommentare_fts_delete": """CREATE TRIGGER IF NOT EXISTS kommentare_fts_delete
+        AFTER DELETE ON kommentare BEGIN
+            INSERT INTO kommentare_fts (kommentare_fts, rowid, text)
+            VALUES ('delete', old.kommentar_id, old.text);
+        END;""",
+    "kommentare_fts_update": """CREATE TRIGGER IF NOT EXISTS kommentare_fts_update
+        AFTER UPDATE ON kommentare BEGIN
+            INSERT INTO kommentare_fts (kommentare_fts, rowid, text)
+            VALUES ('delete', old.kommentar_id, old.text);
+            INSERT INTO kommentare_fts (rowid, text)
+            VALUES (new.kommentar_id, new.text);
+        END;""",
+}
+
+
+def create_indexes(cursor: sqlite3.Cursor) -> None:
+    for statement in index_statements.values():
+        cursor.execute(statement)
+
+
+def drop_indexes(cursor: sqlite3.Cursor) -> None:
+    for index_name in index_statements:
+        cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+def create_fts_triggers(cursor: sqlite3.Cursor) -> None:
+    for statement in fts_trigger_statements.values():
+        cursor.execute(statement)
+
+
+def drop_fts_triggers(cursor: sqlite3.Cursor) -> None:
+    for trigger_name in fts_trigger_statements:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+
+
+# count up the generation in datenstand, called in the transaction of every write that
+# changes data readers may have cached
+def bump_generation(cursor: sqlite3.Cursor) -> None:
+    cursor.execute(
+        """
+        INSERT INTO datenstand (id, generation, geaendert)
+        VALUES (1, 1, datetime('now'))
+        ON CONFLICT (id) DO UPDATE SET
+            generation = generation + 1,
+            geaendert = excluded.geaendert
+    """
+    )
+
+
+# re-index the full-text tables from the content of reden and kommentare, needed after
+# bulk loads and after a VACUUM, which may renumber the rowids of reden
+def rebuild_fts(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("INSERT INTO reden_fts (reden_fts) VALUES ('rebuild')")
+    cursor.execute("INSERT INTO kommentare_fts (kommentare_fts) VALUES ('rebuild')")
+
+
+# databases created before kommentare had an art column hold only spoken interjections
+# with a NOT NULL kommentator and fraktion, sqlite can't drop these constraints in
+# place so the rows are copied into a table of the current schema, the indexes, the
+# triggers and the full-text table are created again by setup_database
+def migrate_kommentare(cursor: sqlite3.Cursor) -> None:
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(kommentare)")]
+    if "art" in columns:
+        return
+
+    drop_indexes(cursor)
+    drop_fts_triggers(cursor)
+    cursor.execute("ALTER TABLE kommentare RENAME TO kommentare_alt")
+    for statement in sql_statements:
+        cursor.execute(statement)
+    cursor.execute(
+        """
+        INSERT INTO kommentare
+            (kommentar_id, kommentar_index, kommentator, fraktion, text, rede_id)
+        SELECT kommentar_id, kommentar_index, kommentator, fraktion, text, rede_id
+        FROM kommentare_alt
+    """
+    )
+    cursor.execute("DROP TABLE kommentare_alt")
+
+
+# databases created before fraktionen were numbered store the name of the fraktion in
+# redner, the fraktionen are numbered in the order their first speaker was loaded and
+# the rows are copied into a table referencing them, the old table is renamed with
+# legacy_alter_table so the foreign keys of reden keep pointing at redner
+def migrate_redner(cursor: sqlite3.Cursor) -> None:
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(redner)")]
+    if "fraktion_id" in columns:
+        return
+
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO fraktionen (name)
+        SELECT fraktion FROM redner WHERE fraktion IS NOT NULL
+        GROUP BY fraktion ORDER BY MIN(redner_id)
+    """
+    )
+    cursor.execute("PRAGMA legacy_alter_table = ON")
+    cursor.execute("ALTER TABLE redner RENAME TO redner_alt")
+    cursor.execute("PRAGMA legacy_alter_table = OFF")
+    for statement in sql_statements:
+        cursor.execute(statement)
+    cursor.execute(
+        """
+        INSERT INTO redner (redner_id, titel, vorname, nachname, fraktion_id)
+        SELECT redner_alt.redner_id, redner_alt.titel, redner_alt.vorname,
+            redner_alt.nachname, fraktionen.fraktion_id
+        FROM redner_alt
+        LEFT JOIN fraktionen ON fraktionen.name = redner_alt.fraktion
+    """
+    )
+    cursor.execute("DROP TABLE redner_alt")
+
 
-def setup_database(database_path: str) -> None:
+def setup_database(database_path: str, fts_tokenize: str = FTS_TOKENIZE) -> None:
     try:
         # connect to and create database
         with sqlite3.connect(database_path) as conn:
@@ -61,6 +303,18 @@ def setup_database(database_path: str) -> None:
 
             for statement in sql_statements:
                 cursor.execute(statement)
+            migrate_kommentare(cursor)
+            migrate_redner(cursor)
+            create_indexes(cursor)
+            for statement in fts_statements:
+                cursor.execute(
+                    statement.format(tokenize=fts_tokenize.replace("'", "''"))
+                )
+            create_fts_triggers(cursor)
+            rebuild_fts(cursor)
+            cursor.execute(
+                "INSERT OR IGNORE INTO datenstand (id, generation) VALUES (1, 0)"
+            )
 
             conn.commit()
             print("tables created successfully")